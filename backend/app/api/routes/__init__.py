@@ -1,3 +1,3 @@
-from . import orders, dates, availability
+from . import orders, dates, availability, photos, uploads
 
-__all__ = ["orders", "dates", "availability"]
+__all__ = ["orders", "dates", "availability", "photos", "uploads"]
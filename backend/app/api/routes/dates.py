@@ -1,40 +1,82 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Query, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from app.core.database import get_db
+from sqlalchemy import select
+from app.core.database import get_db, get_read_db
 from app.models.models import AvailableDate
-from app.schemas.schemas import AvailableDateResponse, AvailableDateCreate, MessageResponse
+from app.schemas.schemas import (
+    AvailableDateResponse, AvailableDateCreate, AvailableDateRangeResponse,
+    AvailableDateBulkRequest, AvailableDateBulkResponse, MessageResponse, AvailableDateListAdapter
+)
+from app.core.json_response import adapter_response
 from app.utils.validators import validate_date_format
+from app.services.availability_cache import availability_cache, invalidate_availability_cache
+from app.services.availability_index import availability_index
+from app.services import read_queries
+from app.services.calendar_ingest import (
+    MAX_CALENDAR_FILE_SIZE, expand_dates, ingest_dates, parse_date, parse_calendar_file
+)
 from datetime import datetime, timedelta
+from typing import Optional
 
 router = APIRouter()
 
 
 @router.get("/available", response_model=list[AvailableDateResponse])
-async def get_available_dates(db: AsyncSession = Depends(get_db)):
-    """Get all available dates from today onwards"""
+async def get_available_dates(request: Request, db: AsyncSession = Depends(get_read_db)):
+    """Get all available dates from today onwards (cached, supports ETag)"""
     try:
-        today = datetime.now().strftime("%Y-%m-%d")
+        return await availability_cache.response(request, db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/range", response_model=AvailableDateRangeResponse)
+async def get_available_date_range(
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    limit: Optional[int] = Query(None, ge=1, le=366),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get open days in range from the calendar bitset index
+    
+    - **from** / **to**: YYYY-MM-DD (default: today .. today + 365 days)
+    - **limit**: return only the next N open days
+    
+    `months` holds one bitmask per month (bit 0 = 1st day) for the calendar.
+    """
+    try:
+        start = datetime.strptime(from_date, "%Y-%m-%d").date() if from_date else datetime.now().date()
+        end = datetime.strptime(to_date, "%Y-%m-%d").date() if to_date else start + timedelta(days=365)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Невалідний формат дати (YYYY-MM-DD)")
+    
+    if end < start or (end - start).days > 3660:
+        raise HTTPException(status_code=400, detail="Невалідний діапазон дат")
+    
+    try:
+        await availability_index.ensure_loaded(db)
         
-        stmt = select(AvailableDate).where(
-            and_(AvailableDate.date >= today, AvailableDate.is_available == True)
-        ).order_by(AvailableDate.date)
+        dates = availability_index.range(start, end, limit)
+        if limit and dates:
+            end = datetime.strptime(dates[-1], "%Y-%m-%d").date()
         
-        result = await db.execute(stmt)
-        dates = result.scalars().all()
-        return dates
+        return AvailableDateRangeResponse(
+            start=start.strftime("%Y-%m-%d"),
+            end=end.strftime("%Y-%m-%d"),
+            dates=dates,
+            months=availability_index.months(start, end)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/all", response_model=list[AvailableDateResponse])
-async def get_all_dates(db: AsyncSession = Depends(get_db)):
+async def get_all_dates(db: AsyncSession = Depends(get_read_db)):
     """Get all dates (admin view)"""
     try:
-        stmt = select(AvailableDate).order_by(AvailableDate.date)
-        result = await db.execute(stmt)
-        dates = result.scalars().all()
-        return dates
+        dates = await read_queries.list_dates(db)
+        return adapter_response(AvailableDateListAdapter, dates)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -63,6 +105,8 @@ async def create_date(
         
         db.add(date)
         await db.commit()
+        invalidate_availability_cache()
+        availability_index.set(date.date, date.is_available)
         await db.refresh(date)
         
         return date
@@ -91,6 +135,8 @@ async def update_date(
         date.is_available = date_data.is_available
         
         await db.commit()
+        invalidate_availability_cache()
+        availability_index.set(date.date, date.is_available)
         await db.refresh(date)
         
         return date
@@ -114,6 +160,8 @@ async def delete_date(date_id: int, db: AsyncSession = Depends(get_db)):
         
         await db.delete(date)
         await db.commit()
+        invalidate_availability_cache()
+        availability_index.remove(date.date)
         
         return MessageResponse(message="Дата видалена")
     except HTTPException:
@@ -134,30 +182,110 @@ async def bulk_create_dates(
         if not validate_date_format(start_date) or not validate_date_format(end_date):
             raise HTTPException(status_code=400, detail="Невалідний формат дати")
         
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d")
-        
-        created_count = 0
-        current = start
-        
-        while current <= end:
-            # Skip weekends
-            if current.weekday() < 5:
-                date_str = current.strftime("%Y-%m-%d")
-                
-                # Check if exists
-                stmt = select(AvailableDate).where(AvailableDate.date == date_str)
-                result = await db.execute(stmt)
-                if not result.scalar_one_or_none():
-                    date = AvailableDate(date=date_str, is_available=True)
-                    db.add(date)
-                    created_count += 1
+        try:
+            dates = expand_dates(ranges=[(parse_date(start_date), parse_date(end_date))])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        result = await ingest_dates(db, dates)
+        await db.commit()
+        _after_ingest(result, True)
+        
+        return MessageResponse(message=f"Створено {result['created']} дат")
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _after_ingest(result: dict, is_available: bool):
+    """Refresh cache and index after bulk insert"""
+    invalidate_availability_cache()
+    for date_str in result["created_dates"]:
+        availability_index.set(date_str, is_available)
+
+
+@router.post("/bulk-ingest", response_model=AvailableDateBulkResponse)
+async def bulk_ingest_dates(
+    data: AvailableDateBulkRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Bulk create dates in one statement
+    
+    - **ranges**: date ranges, filtered by **weekdays** (Monday = 0, default Mon-Fri)
+    - **dates**: single dates added regardless of weekday
+    - **exclude**: dates never added (e.g. public holidays)
+    
+    Existing dates are skipped.
+    """
+    try:
+        try:
+            dates = expand_dates(
+                ranges=[(parse_date(r.start), parse_date(r.end)) for r in data.ranges],
+                dates=[parse_date(d) for d in data.dates],
+                weekdays=data.weekdays,
+                exclude=[parse_date(d) for d in data.exclude]
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        result = await ingest_dates(db, dates, data.is_available)
+        await db.commit()
+        _after_ingest(result, data.is_available)
+        
+        return AvailableDateBulkResponse(**result)
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/bulk-upload", response_model=AvailableDateBulkResponse)
+async def bulk_upload_dates(
+    file: UploadFile = File(...),
+    mode: str = Form("exclude", pattern="^(include|exclude)$"),
+    start_date: Optional[str] = Form(None),
+    end_date: Optional[str] = Form(None),
+    weekdays: str = Form("0,1,2,3,4"),
+    is_available: bool = Form(True),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Bulk create dates from CSV or ICS file
+    
+    - **mode=exclude**: file lists days off (e.g. public holidays ICS); days of
+      **start_date**..**end_date** matching **weekdays** are added except those
+    - **mode=include**: dates / ranges from the file are added
+    """
+    try:
+        try:
+            # One byte over the cap tells a large file from one exactly at it
+            content = await file.read(MAX_CALENDAR_FILE_SIZE + 1)
+            if len(content) > MAX_CALENDAR_FILE_SIZE:
+                raise ValueError(f"File too large (max. {MAX_CALENDAR_FILE_SIZE // 1024} KB)")
+            file_ranges, file_dates = parse_calendar_file(file.filename or "", content)
+            
+            allowed_weekdays = [int(d) for d in weekdays.split(",") if d.strip()]
+            ranges = [(parse_date(start_date), parse_date(end_date))] if start_date and end_date else []
             
-            current += timedelta(days=1)
+            if mode == "include":
+                dates = expand_dates(
+                    ranges=ranges + file_ranges, dates=file_dates, weekdays=allowed_weekdays
+                )
+            else:
+                excluded = expand_dates(ranges=file_ranges, dates=file_dates, weekdays=range(7))
+                dates = expand_dates(ranges=ranges, weekdays=allowed_weekdays, exclude=excluded)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
+        result = await ingest_dates(db, dates, is_available)
         await db.commit()
+        _after_ingest(result, is_available)
         
-        return MessageResponse(message=f"Створено {created_count} дат")
+        return AvailableDateBulkResponse(**result)
     except HTTPException:
         raise
     except Exception as e:
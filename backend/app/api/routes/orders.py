@@ -1,17 +1,66 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
-from app.core.database import get_db
+from sqlalchemy import select, insert, func, literal
+from app.core.database import get_db, get_read_db, ReadSessionLocal
+from app.core.dialect import lock_keys
 from app.models.models import Order, SMSVerification
-from app.schemas.schemas import OrderResponse, OrderCreate, OrderUpdate, MessageResponse
-from app.services.file_service import save_multiple_files, delete_multiple_files, validate_file
-from app.services.telegram_service import notify_new_order, notify_status_change
+from app.schemas.schemas import OrderResponse, OrderCreate, OrderUpdate, MessageResponse, OrderAdapter, OrderListAdapter
+from app.core.json_response import adapter_response
+from app.services.file_service import (
+    save_multiple_files, delete_multiple_files, validate_file, acquire_photos, release_photos,
+    purge_photos, add_order_photos, remove_order_photos
+)
+from app.services.availability_index import availability_index
+from app.services.notification_outbox import enqueue_notification, wake_outbox_workers
+from app.services.order_search import search_orders
+from app.services import read_queries
 from app.utils.validators import validate_phone_number, validate_text_length
+from app.utils.pagination import encode_cursor, decode_cursor
 from datetime import datetime
-from typing import List
+from typing import List, Optional
+import csv
+import io
+import json
 
 router = APIRouter()
 
+MAX_ACTIVE_ORDERS_PER_DAY = 2
+ORDER_LIMIT_DETAIL = "Już masz 2 zamówienia na ten numer telefonu. Skontaktuj się bezpośrednio z nami, jeśli potrzebujesz więcej zamówień."
+
+
+def _active_orders_count(phone: str, selected_date: Optional[str]):
+    """Active (not completed) orders of a phone for a date, served by ix_orders_phone_selected_date_status"""
+    return select(func.count()).select_from(Order).where(
+        Order.phone == phone,
+        Order.selected_date == selected_date,
+        Order.status != "completed"
+    ).scalar_subquery()
+
+
+async def _insert_order_within_limit(db: AsyncSession, values: dict) -> Optional[int]:
+    """
+    Insert order only if the phone is below the daily limit
+    
+    Check and insert are one INSERT ... SELECT ... WHERE statement, so on
+    SQLite the count is evaluated under the same write lock as the insert and
+    concurrent submissions cannot both pass. Returns new order id or None.
+    """
+    # PostgreSQL: under READ COMMITTED two inserts could see the same count,
+    # serialize submissions per phone and date until commit
+    await lock_keys(db, f"order-limit:{values['phone']}:{values['selected_date']}")
+    
+    columns = list(values)
+    source = select(*[
+        literal(values[name], Order.__table__.c[name].type) for name in columns
+    ]).where(
+        _active_orders_count(values["phone"], values["selected_date"]) < MAX_ACTIVE_ORDERS_PER_DAY
+    )
+    result = await db.execute(
+        insert(Order).from_select(columns, source).returning(Order.id)
+    )
+    return result.scalar_one_or_none()
+
 
 @router.post("", response_model=OrderResponse)
 async def create_order(
@@ -20,7 +69,8 @@ async def create_order(
     description: str = Form(...),
     selected_date: str = Form(None),
     files: List[UploadFile] = File(default=[]),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db)
 ):
     """Create a new order"""
     try:
@@ -29,17 +79,18 @@ async def create_order(
             raise HTTPException(status_code=400, detail="Неправильний номер телефону")
         
         # Перевіримо макс 2 АКТИВНІ замовлення в один день з одного номера (не рахуємо completed)
-        count_stmt = select(func.count()).select_from(Order).where(
-            and_(
-                Order.phone == phone, 
-                Order.selected_date == selected_date,
-                Order.status != "completed"
-            )
-        )
-        count_result = await db.execute(count_stmt)
-        order_count = count_result.scalar()
-        if order_count >= 2:
-            raise HTTPException(status_code=400, detail="Już masz 2 zamówienia na ten numer telefonu. Skontaktuj się bezpośrednio z nami, jeśli potrzebujesz więcej zamówień.")
+        # Cheap early rejection before saving files; the insert below re-checks atomically.
+        # Read pool: the writer session is first used by the insert, so the
+        # write lock is not held for pre-checks
+        order_count = (await read_db.execute(select(_active_orders_count(phone, selected_date)))).scalar()
+        if order_count >= MAX_ACTIVE_ORDERS_PER_DAY:
+            raise HTTPException(status_code=400, detail=ORDER_LIMIT_DETAIL)
+        
+        # Reject dates the admin explicitly closed in the calendar (O(1) bitset lookup)
+        if selected_date:
+            await availability_index.ensure_loaded(read_db)
+            if availability_index.is_closed(selected_date):
+                raise HTTPException(status_code=400, detail="Wybrana data jest niedostępna")
         
         # Validate text fields
         if not validate_text_length(address, 5, 255):
@@ -47,40 +98,55 @@ async def create_order(
         if not validate_text_length(description, 10, 1000):
             raise HTTPException(status_code=400, detail="Опис повинен бути від 10 до 1000 символів")
         
+        # Don't hold the read transaction open while files are written
+        await read_db.rollback()
+        
         # Save files
-        photo_filenames = []
+        saved_files = []
         if files and len(files) > 0:
             result = await save_multiple_files(files)
             if result.get("success"):
-                # Витягуємо тільки імена файлів
-                photo_filenames = [f["filename"] for f in result.get("saved_files", [])]
+                saved_files = result.get("saved_files", [])
+        
+        # Витягуємо тільки імена файлів
+        photo_filenames = [f["filename"] for f in saved_files]
         
         # Create order
-        order = Order(
-            phone=phone,
-            address=address,
-            description=description,
-            selected_date=selected_date,
-            photos=photo_filenames,
-            status="new"
+        order_id = await _insert_order_within_limit(db, {
+            "phone": phone,
+            "address": address,
+            "description": description,
+            "selected_date": selected_date,
+            "photos": photo_filenames,
+            "status": "new",
+        })
+        if order_id is None:
+            # Lost the race against a concurrent submission: drop the files this
+            # request wrote, unless an order committed a reference meanwhile
+            # (one still in flight re-writes them in acquire_photos)
+            await db.rollback()
+            await purge_photos(db, [f["filename"] for f in saved_files if not f.get("deduplicated")])
+            raise HTTPException(status_code=400, detail=ORDER_LIMIT_DETAIL)
+        
+        order = await db.get(Order, order_id)
+        await acquire_photos(db, saved_files)
+        await add_order_photos(db, order_id, saved_files)
+        
+        # Queue Telegram notification in the same transaction (delivered by outbox workers)
+        enqueue_notification(
+            db,
+            "new_order",
+            order_id=order.id,
+            phone=order.phone,
+            address=order.address,
+            description=order.description,
+            selected_date=order.selected_date,
+            photo_paths=order.photos
         )
         
-        db.add(order)
         await db.commit()
         await db.refresh(order)
-        
-        # Send Telegram notification
-        try:
-            await notify_new_order(
-                order_id=order.id,
-                phone=order.phone,
-                address=order.address,
-                description=order.description,
-                selected_date=order.selected_date,
-                photo_paths=order.photos
-            )
-        except Exception as e:
-            print(f"Telegram notification error: {e}")
+        wake_outbox_workers()
         
         return order
     
@@ -94,35 +160,166 @@ async def create_order(
 @router.get("", response_model=List[OrderResponse])
 async def get_orders(
     status: str = None,
-    db: AsyncSession = Depends(get_db)
+    phone: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all orders with optional status filter"""
+    """
+    Get orders, newest first, with optional filters
+    
+    - **status**, **phone**: exact match
+    - **date_from** / **date_to**: selected_date range (YYYY-MM-DD, inclusive)
+    - **limit** / **cursor**: keyset pagination; the cursor of the next page is
+      returned in `X-Next-Cursor` (without limit all orders are returned)
+    - **include_total**: return total count of matching orders in `X-Total-Count`
+    """
     try:
-        query = select(Order)
-        if status:
-            query = query.where(Order.status == status)
-        query = query.order_by(Order.created_at.desc())
-        
-        result = await db.execute(query)
-        orders = result.scalars().all()
-        return orders
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Невалідний курсор")
+        
+        filters = {"status": status, "phone": phone, "date_from": date_from, "date_to": date_to}
+        orders = await read_queries.list_orders(
+            db, **filters, after=after, limit=limit + 1 if limit else None
+        )
+        
+        headers = {}
+        if limit and len(orders) > limit:
+            orders = orders[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(orders[-1]["created_at"], orders[-1]["id"])
+        
+        if include_total:
+            headers["X-Total-Count"] = str(await read_queries.count_orders(db, **filters))
+        
+        return adapter_response(OrderListAdapter, orders, headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+EXPORT_COLUMNS = [
+    Order.id, Order.phone, Order.address, Order.description, Order.selected_date,
+    Order.photos, Order.status, Order.created_at, Order.updated_at
+]
+EXPORT_BATCH_SIZE = 500
+
+
+async def _export_rows(filters: list):
+    """Yield batches of order rows through a server-side cursor (own read session)"""
+    async with ReadSessionLocal() as db:
+        stmt = select(*EXPORT_COLUMNS).where(*filters).order_by(Order.id).execution_options(
+            yield_per=EXPORT_BATCH_SIZE
+        )
+        result = await db.stream(stmt)
+        async for batch in result.mappings().partitions():
+            yield batch
+
+
+async def _export_ndjson(filters: list):
+    async for batch in _export_rows(filters):
+        yield "".join(
+            json.dumps(dict(row), ensure_ascii=False, default=_json_default) + "\n"
+            for row in batch
+        )
+
+
+async def _export_csv(filters: list):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in EXPORT_COLUMNS])
+    
+    async for batch in _export_rows(filters):
+        for row in batch:
+            writer.writerow([
+                ";".join(value or []) if key == "photos"
+                else value.isoformat() if isinstance(value, datetime)
+                else value
+                for key, value in row.items()
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+@router.get("/export")
+async def export_orders(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None
+):
+    """
+    Export orders as NDJSON or CSV stream
+    
+    Rows are read in batches through a server-side cursor and written to
+    the response as they arrive, so memory use does not depend on the
+    number of orders.
+    """
+    filters = []
+    if status:
+        filters.append(Order.status == status)
+    if date_from:
+        filters.append(Order.selected_date >= date_from)
+    if date_to:
+        filters.append(Order.selected_date <= date_to)
+    
+    filename = f"orders_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{'csv' if format == 'csv' else 'ndjson'}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    
+    if format == "csv":
+        return StreamingResponse(_export_csv(filters), media_type="text/csv; charset=utf-8", headers=headers)
+    return StreamingResponse(_export_ndjson(filters), media_type="application/x-ndjson", headers=headers)
+
+
+@router.get("/search", response_model=List[OrderResponse])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    status: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Full-text search over address and description
+    
+    Words are matched as prefixes, case and diacritics are ignored
+    ("lodz" finds "Łódź"). Best matches first; total count of matches is
+    returned in `X-Total-Count` (exposed to cross-origin clients by CORS).
+    """
+    try:
+        orders, total = await search_orders(db, q, status=status, limit=limit, offset=offset)
+        return adapter_response(OrderListAdapter, orders, headers={"X-Total-Count": str(total)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 
 @router.get("/{order_id}", response_model=OrderResponse)
-async def get_order(order_id: int, db: AsyncSession = Depends(get_db)):
+async def get_order(order_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get a specific order"""
     try:
-        stmt = select(Order).where(Order.id == order_id)
-        result = await db.execute(stmt)
-        order = result.scalar_one_or_none()
+        order = await read_queries.get_order(db, order_id)
         
         if not order:
             raise HTTPException(status_code=404, detail="Замовлення не знайдено")
         
-        return order
+        return adapter_response(OrderAdapter, order)
     except HTTPException:
         raise
     except Exception as e:
@@ -152,18 +349,18 @@ async def update_order_status(
         order.status = update.status
         order.updated_at = datetime.now()
         
+        # Queue Telegram notification in the same transaction (delivered by outbox workers)
+        enqueue_notification(
+            db,
+            "status_change",
+            order_id=order.id,
+            old_status=old_status,
+            new_status=order.status
+        )
+        
         await db.commit()
         await db.refresh(order)
-        
-        # Send Telegram notification
-        try:
-            await notify_status_change(
-                order_id=order.id,
-                old_status=old_status,
-                new_status=order.status
-            )
-        except Exception as e:
-            print(f"Telegram notification error: {e}")
+        wake_outbox_workers()
         
         return order
     except HTTPException:
@@ -184,17 +381,23 @@ async def delete_order(order_id: int, db: AsyncSession = Depends(get_db)):
         if not order:
             raise HTTPException(status_code=404, detail="Замовлення не знайдено")
         
-        # Delete files (non-critical)
-        if order.photos:
-            try:
-                delete_multiple_files(order.photos)
-            except Exception as file_err:
-                print(f"File deletion error (non-critical): {file_err}")
+        # Drop photo references; shared photos stay until their last order is deleted
+        orphaned_photos = await release_photos(db, order.photos or [])
+        await remove_order_photos(db, order.id)
         
         # Delete order
-        db.delete(order)
+        await db.delete(order)
         await db.commit()
         
+        # Delete unreferenced files (non-critical); re-checked under the photo
+        # locks, an order created meanwhile may have taken the photo again
+        if orphaned_photos:
+            try:
+                await purge_photos(db, orphaned_photos)
+            except Exception as file_err:
+                await db.rollback()
+                print(f"File deletion error (non-critical): {file_err}")
+        
         return MessageResponse(message="Замовлення видалено")
     except HTTPException:
         raise
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional
+
+from app.core.file_response import CachedFileResponse
+from app.services.image_cache import image_cache
+
+router = APIRouter()
+
+
+@router.api_route("/{filename}", methods=["GET", "HEAD"])
+async def get_resized_photo(
+    filename: str,
+    request: Request,
+    w: int = Query(320, ge=1, le=4096),
+    format: Optional[str] = Query(None, pattern="^(avif|webp|jpe?g)$")
+):
+    """
+    Get photo resized to requested width
+    
+    Width is rounded up to the nearest configured size. Format is taken from
+    `format` or negotiated from the Accept header (AVIF, WebP, JPEG).
+    """
+    try:
+        width = image_cache.snap_width(w)
+        image_format = image_cache.negotiate_format(request.headers.get("accept"), format)
+        
+        for attempt in range(2):
+            derivative = await image_cache.get(filename, width, image_format)
+            if not derivative:
+                raise HTTPException(status_code=404, detail="Фото не знайдено")
+            
+            path, media_type = derivative
+            try:
+                return CachedFileResponse(
+                    path,
+                    request.headers,
+                    method=request.method,
+                    media_type=media_type,
+                    headers={"Vary": "Accept"}
+                )
+            except FileNotFoundError:
+                # Evicted by another worker after the lookup: render it again
+                if attempt:
+                    raise
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error serving resized photo: {e}")
+        raise HTTPException(status_code=500, detail="Error serving photo")
@@ -0,0 +1,28 @@
+import os
+from fastapi import APIRouter, HTTPException, Request
+
+from app.core.file_response import CachedFileResponse
+from app.services.file_service import file_service
+
+router = APIRouter()
+
+
+@router.api_route("/photos/{filename}", methods=["GET", "HEAD"])
+async def get_photo(filename: str, request: Request):
+    """
+    Serve original photo
+    
+    Photos never change once stored, so responses are cacheable forever
+    and support conditional (ETag) and byte Range requests.
+    """
+    filepath = os.path.join(file_service.photos_dir, filename)
+    # Hidden files (.gitkeep) and in-progress uploads (.part) are not photos
+    if (
+        os.path.basename(filename) != filename
+        or filename.startswith(".")
+        or filename.endswith(".part")
+        or not os.path.isfile(filepath)
+    ):
+        raise HTTPException(status_code=404, detail="Фото не знайдено")
+    
+    return CachedFileResponse(filepath, request.headers, method=request.method)
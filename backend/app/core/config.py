@@ -1,4 +1,5 @@
 import os
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -9,6 +10,23 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./handyman.db")
     
+    # Database pool (PostgreSQL via asyncpg)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # seconds
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100  # prepared statements per connection, 0 behind pgbouncer
+    
+    # SQLite profile (applied on every connection)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024  # 64MB page cache per connection
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # 256MB
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_READ_POOL_SIZE: int = 4  # read-only connections for GET routes (one writer)
+    
     # Admin
     ADMIN_USERNAME: str = os.getenv("ADMIN_USERNAME", "admin")
     ADMIN_PASSWORD: str = os.getenv("ADMIN_PASSWORD", "admin")
@@ -16,8 +34,26 @@ class Settings(BaseSettings):
     # File Upload
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "./uploads")
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 64 * 1024  # 64KB per read/write
+    UPLOAD_CONCURRENCY_PER_REQUEST: int = 5
+    UPLOAD_CONCURRENCY_GLOBAL: int = 20
+    
+    # Image processing (Pillow work runs in a process pool)
+    IMAGE_WORKERS: int = max(1, (os.cpu_count() or 2) - 1)
+    IMAGE_QUEUE_SIZE: int = 32
+    IMAGE_MP_START_METHOD: str = "spawn"
+    
+    # Resized image derivatives (on-demand, LRU disk cache)
+    IMAGE_WIDTHS: list = [160, 320, 640, 1024, 1920]
+    IMAGE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024  # 512MB
+    IMAGE_DERIVATIVE_QUALITY: int = 80
     ALLOWED_EXTENSIONS: list = ["jpg", "jpeg", "png", "gif", "webp"]
     
+    # Available dates cache (public booking form endpoints)
+    AVAILABILITY_CACHE_TTL: int = 60
+    AVAILABILITY_MAX_AGE: int = 30
+    AVAILABILITY_STALE_WHILE_REVALIDATE: int = 300
+    
     # SMS
     SMS_CODE_LENGTH: int = 6
     SMS_CODE_EXPIRY_MINUTES: int = 10
@@ -26,6 +62,48 @@ class Settings(BaseSettings):
     TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
     TELEGRAM_CHAT_ID: str = os.getenv("TELEGRAM_CHAT_ID", "")
     
+    # Telegram HTTP client (shared, opened in lifespan)
+    TELEGRAM_HTTP2: bool = True
+    TELEGRAM_MAX_CONNECTIONS: int = 10
+    TELEGRAM_MAX_KEEPALIVE_CONNECTIONS: int = 5
+    TELEGRAM_KEEPALIVE_EXPIRY: float = 60.0
+    TELEGRAM_CONNECT_TIMEOUT: float = 5.0
+    TELEGRAM_READ_TIMEOUT: float = 30.0
+    TELEGRAM_WRITE_TIMEOUT: float = 30.0
+    TELEGRAM_POOL_TIMEOUT: float = 10.0
+    
+    # Telegram rate limits (Bot API: ~30 msg/s global, ~1 msg/s per chat, 20 msg/min per group)
+    TELEGRAM_GLOBAL_RATE: float = 30.0
+    TELEGRAM_GLOBAL_BURST: int = 30
+    TELEGRAM_CHAT_RATE: float = 1.0
+    TELEGRAM_CHAT_BURST: int = 3
+    TELEGRAM_GROUP_RATE_PER_MINUTE: int = 20
+    TELEGRAM_MAX_RETRIES: int = 5
+    
+    # Notification outbox (background delivery workers)
+    OUTBOX_WORKERS: int = 2
+    OUTBOX_BATCH_SIZE: int = 10
+    OUTBOX_POLL_INTERVAL: float = 5.0
+    OUTBOX_LEASE_SECONDS: int = 120
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_BACKOFF_BASE: float = 2.0
+    OUTBOX_BACKOFF_MAX: float = 900.0
+    
+    # Metrics (/metrics, Prometheus text format)
+    METRICS_ENABLED: bool = True
+    METRICS_MULTIPROC_DIR: str = os.getenv("METRICS_MULTIPROC_DIR", "")  # shared by uvicorn workers, empty = single process
+    METRICS_FLUSH_INTERVAL: float = 5.0  # seconds between worker snapshots
+    METRICS_LOOP_LAG_INTERVAL: float = 0.5
+    
+    @field_validator("DATABASE_URL")
+    @classmethod
+    def use_async_driver(cls, value: str) -> str:
+        """Hosting providers hand out postgres:// URLs; the app needs asyncpg"""
+        for prefix in ("postgres://", "postgresql://"):
+            if value.startswith(prefix):
+                return "postgresql+asyncpg://" + value[len(prefix):]
+        return value
+    
     class Config:
         env_file = ".env"
 
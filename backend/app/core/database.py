@@ -1,20 +1,116 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,
-    future=True,
-)
+
+def _is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def _sqlite_pragmas(read_only: bool) -> list:
+    pragmas = [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}",
+        f"PRAGMA temp_store={settings.SQLITE_TEMP_STORE}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def _configure_sqlite(async_engine, read_only: bool):
+    """Apply the SQLite profile on connect; writer transactions start with BEGIN IMMEDIATE"""
+    pragmas = _sqlite_pragmas(read_only)
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # Let SQLAlchemy emit BEGIN itself (see on_begin)
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    if not read_only:
+        @event.listens_for(async_engine.sync_engine, "begin")
+        def on_begin(conn):
+            # Take the write lock up front so busy_timeout applies, instead of
+            # failing when a read transaction is upgraded after another write
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+if _is_sqlite_file(settings.DATABASE_URL):
+    # SQLite allows one writer at a time: a single pooled connection
+    # serializes writes in-process, GET routes use a separate read-only pool
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        echo=False,
+        future=True,
+        pool_size=1,
+        max_overflow=0,
+    )
+    read_engine = create_async_engine(
+        settings.DATABASE_URL,
+        echo=False,
+        future=True,
+        pool_size=settings.SQLITE_READ_POOL_SIZE,
+        max_overflow=0,
+    )
+    _configure_sqlite(engine, read_only=False)
+    _configure_sqlite(read_engine, read_only=True)
+elif make_url(settings.DATABASE_URL).get_backend_name() == "postgresql":
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        echo=False,
+        future=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+    )
+    # MVCC: readers never block the writer, one pool serves both
+    read_engine = engine
+else:
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        echo=False,
+        future=True,
+    )
+    read_engine = engine
+
+instrument_engine(engine, "main")
+if read_engine is not engine:
+    instrument_engine(read_engine, "read")
 
 AsyncSessionLocal = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+ReadSessionLocal = async_sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_read_db():
+    """Session on the read-only pool (for GET routes)"""
+    async with ReadSessionLocal() as session:
+        yield session
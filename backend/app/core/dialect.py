@@ -0,0 +1,33 @@
+"""
+Helpers for statements that differ between SQLite and PostgreSQL
+"""
+from sqlalchemy import select, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def dialect_name(db: AsyncSession) -> str:
+    """'sqlite' or 'postgresql'"""
+    return db.bind.dialect.name
+
+
+def upsert(db: AsyncSession, model):
+    """INSERT with .on_conflict_do_nothing() / .on_conflict_do_update() for the session's database"""
+    if dialect_name(db) == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+async def lock_keys(db: AsyncSession, *keys: str):
+    """
+    Hold transaction-scoped locks on string keys until commit/rollback
+
+    PostgreSQL: pg_advisory_xact_lock per key, taken in sorted order so two
+    transactions locking overlapping keys cannot deadlock. SQLite: nothing to
+    do, writer transactions start with BEGIN IMMEDIATE and already hold the
+    database-wide write lock.
+    """
+    if dialect_name(db) != "postgresql":
+        return
+    for key in sorted(set(keys)):
+        await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(key))))
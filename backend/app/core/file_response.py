@@ -0,0 +1,210 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+from typing import Optional, Tuple
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("image/avif", ".avif")
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Precompressed siblings, in order of preference: Accept-Encoding token -> suffix
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_CONTENT_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def make_etag(path: str, stat: os.stat_result) -> str:
+    """Strong ETag: content hash for content-addressed files, size+mtime otherwise"""
+    stem = os.path.basename(path).split(".")[0]
+    if _CONTENT_HASH_RE.match(stem):
+        return f'"{stem}"'
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_accept_encoding(header: Optional[str]) -> dict:
+    """Accept-Encoding as {coding: q}; codings with q=0 are refused"""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check with weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse single byte range, returns inclusive (start, end)
+
+    Returns None when the header is missing or not a single range (the full
+    body is served), raises ValueError for unsatisfiable ranges.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.group(0) == "bytes=-":
+        return None
+
+    start, end = match.groups()
+    if start == "":
+        # Suffix range: last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - length), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+class CachedFileResponse(Response):
+    """
+    File response for immutable files
+
+    Sends a strong ETag and long-lived Cache-Control, answers conditional
+    requests with 304, supports single byte ranges (206/416), prefers
+    precompressed .br/.gz siblings when the client accepts them and uses
+    the ASGI zero-copy send extension when the server provides it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        request_headers,
+        method: str = "GET",
+        media_type: Optional[str] = None,
+        cache_control: str = IMMUTABLE_CACHE_CONTROL,
+        headers: Optional[dict] = None
+    ):
+        super().__init__(status_code=200, headers=headers)
+        self.path = path
+        self.send_body = method != "HEAD"
+        self.media_type = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.offset = 0
+        self.count = 0
+
+        stat = os.stat(path)
+        etag = make_etag(path, stat)
+        vary = [self.headers["vary"]] if "vary" in self.headers else []
+
+        # Precompressed variant: highest q wins, ties go to PRECOMPRESSED order
+        accepted = parse_accept_encoding(request_headers.get("accept-encoding"))
+        candidates = [
+            (encoding, suffix) for encoding, suffix in PRECOMPRESSED
+            if accepted.get(encoding, accepted.get("*", 0.0)) > 0
+        ]
+        candidates.sort(key=lambda item: -accepted.get(item[0], accepted.get("*", 0.0)))
+        for encoding, suffix in candidates:
+            if os.path.isfile(path + suffix):
+                self.path = path + suffix
+                stat = os.stat(self.path)
+                etag = f'{etag[:-1]}-{encoding}"'
+                self.headers["content-encoding"] = encoding
+                break
+        if any(os.path.isfile(path + suffix) for _, suffix in PRECOMPRESSED):
+            vary.append("Accept-Encoding")
+
+        size = stat.st_size
+        self.headers["etag"] = etag
+        self.headers["cache-control"] = cache_control
+        self.headers["last-modified"] = formatdate(stat.st_mtime, usegmt=True)
+        self.headers["accept-ranges"] = "bytes"
+        self.headers["content-type"] = self.media_type
+        if vary:
+            self.headers["vary"] = ", ".join(vary)
+
+        # Conditional request
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            # 304 carries no body and no Content-Length (it would describe the 200 body)
+            self.status_code = 304
+            self.send_body = False
+            del self.headers["content-length"]
+            return
+
+        # Range request (ignored when If-Range does not match current ETag)
+        byte_range = None
+        if_range = request_headers.get("if-range")
+        if not if_range or if_range.strip() == etag:
+            try:
+                byte_range = parse_range(request_headers.get("range"), size)
+            except ValueError:
+                self.status_code = 416
+                self.send_body = False
+                self.headers["content-range"] = f"bytes */{size}"
+                self.headers["content-length"] = "0"
+                return
+
+        if byte_range:
+            start, end = byte_range
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.offset, self.count = start, end - start + 1
+        else:
+            self.offset, self.count = 0, size
+
+        self.headers["content-length"] = str(self.count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if not self.send_body or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+            return
+
+        remaining = self.count
+        async with await anyio.open_file(self.path, "rb") as f:
+            await f.seek(self.offset)
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
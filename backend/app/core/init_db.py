@@ -6,11 +6,10 @@ Run this script after first deployment to populate available dates
 import asyncio
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy import select
 
 from app.core.config import settings
 from app.core.database import Base
-from app.models.models import AvailableDate
+from app.services.calendar_ingest import expand_dates, ingest_dates
 
 
 async def create_tables():
@@ -30,33 +29,14 @@ async def populate_available_dates():
     async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
     
     async with async_session_maker() as session:
-        today = datetime.now()
-        dates_created = 0
+        today = datetime.now().date()
         
-        for i in range(1, 60):  # Next 60 days
-            current_date = today + timedelta(days=i)
-            
-            # Skip weekends (Saturday = 5, Sunday = 6)
-            if current_date.weekday() >= 5:
-                continue
-            
-            date_str = current_date.strftime("%Y-%m-%d")
-            
-            # Check if date already exists
-            stmt = select(AvailableDate).where(AvailableDate.date == date_str)
-            result = await session.execute(stmt)
-            existing = result.scalar_one_or_none()
-            
-            if not existing:
-                new_date = AvailableDate(
-                    date=date_str,
-                    is_available=1
-                )
-                session.add(new_date)
-                dates_created += 1
+        # Next 60 days, skipping weekends (Saturday = 5, Sunday = 6)
+        dates = expand_dates(ranges=[(today + timedelta(days=1), today + timedelta(days=59))])
+        result = await ingest_dates(session, dates)
         
         await session.commit()
-        print(f"✅ Created {dates_created} available dates")
+        print(f"✅ Created {result['created']} available dates")
     
     await engine.dispose()
 
@@ -0,0 +1,380 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+# Seconds; requests, Telegram calls and image work
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette appends charset=utf-8
+
+DB_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "BEGIN", "COMMIT", "ROLLBACK", "WITH", "PRAGMA"}
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def snapshot(self) -> list:
+        return [[list(labels), value] for labels, value in self.values.items()]
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self.series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def snapshot(self) -> list:
+        return [[list(labels), list(counts), total] for labels, (counts, total) in self.series.items()]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _server_run_id() -> str:
+    """
+    Identifies the running server: pid and start time of the parent (the
+    uvicorn/gunicorn master), so a reused pid is not the same run
+    """
+    ppid = os.getppid()
+    try:
+        with open(f"/proc/{ppid}/stat") as f:
+            started = f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        started = "0"  # no procfs: the pid alone
+    return f"{ppid}.{started}"
+
+
+class Metrics:
+    """
+    In-process counters and histograms in the Prometheus text format
+
+    Recording is a dict lookup and an increment on the event loop thread,
+    no locks and no I/O. With several uvicorn workers set METRICS_MULTIPROC_DIR:
+    every worker writes its snapshot to <dir>/<run>-<pid>-<token>.json every
+    METRICS_FLUSH_INTERVAL seconds and on shutdown, /metrics sums the files
+    of all workers (other workers' numbers are at most one interval old).
+    <run> identifies the server run and <token> the worker start, so a
+    reused pid never overwrites another worker's file. Files of stopped
+    workers of the same run are kept, so counters never go backwards;
+    files of earlier runs are removed when a worker starts.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, Counter] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.multiproc_dir = settings.METRICS_MULTIPROC_DIR
+        self._tasks: List[asyncio.Task] = []
+        self._run_id: Optional[str] = None
+        self._token: Optional[str] = None
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = self.counters[name] = Counter(name, help, labelnames)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        metric = self.histograms[name] = Histogram(name, help, labelnames, buckets)
+        return metric
+
+    # --- Background tasks ---
+
+    async def start(self):
+        """Start loop lag monitor and snapshot flushing (called from app lifespan)"""
+        if self._tasks or not settings.METRICS_ENABLED:
+            return
+        self._tasks.append(asyncio.create_task(self._monitor_loop_lag()))
+        if self.multiproc_dir:
+            self._run_id = _server_run_id()
+            self._token = uuid.uuid4().hex[:12]
+            os.makedirs(self.multiproc_dir, exist_ok=True)
+            await asyncio.to_thread(self._remove_stale_snapshots)
+            self._tasks.append(asyncio.create_task(self._flush_periodically()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.multiproc_dir and self._token:
+            await asyncio.to_thread(self.flush, self.snapshot())
+
+    async def _monitor_loop_lag(self):
+        """How late a sleep wakes up = how long callbacks waited for the loop"""
+        interval = settings.METRICS_LOOP_LAG_INTERVAL
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - started - interval))
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(settings.METRICS_FLUSH_INTERVAL)
+            try:
+                await asyncio.to_thread(self.flush, self.snapshot())
+            except Exception as e:
+                print(f"Metrics flush error: {e}")
+
+    # --- Snapshots ---
+
+    def snapshot(self) -> dict:
+        """Current values of this process (taken on the loop thread)"""
+        return {
+            "counters": {name: metric.snapshot() for name, metric in self.counters.items()},
+            "histograms": {name: metric.snapshot() for name, metric in self.histograms.items()},
+        }
+
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.multiproc_dir, f"{self._run_id}-{os.getpid()}-{self._token}.json")
+
+    def _remove_stale_snapshots(self):
+        """Delete snapshots left by earlier server runs (blocking)"""
+        for entry in os.listdir(self.multiproc_dir):
+            if entry.startswith(f"{self._run_id}-"):
+                continue
+            try:
+                os.remove(os.path.join(self.multiproc_dir, entry))
+            except FileNotFoundError:
+                pass  # removed by a sibling worker
+
+    def flush(self, snapshot: dict):
+        """Write this worker's snapshot atomically (blocking, run in a thread)"""
+        path = self._snapshot_path()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, path)
+
+    def _load_snapshots(self, own: dict) -> List[dict]:
+        """Snapshots of all workers, this one taken live (blocking)"""
+        snapshots = [own]
+        own_file = os.path.basename(self._snapshot_path())
+        for entry in os.listdir(self.multiproc_dir):
+            if not entry.startswith(f"{self._run_id}-") or not entry.endswith(".json") or entry == own_file:
+                continue
+            try:
+                with open(os.path.join(self.multiproc_dir, entry)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # being replaced or removed
+        return snapshots
+
+    async def collect(self) -> List[dict]:
+        own = self.snapshot()
+        if not self.multiproc_dir or self._token is None:
+            return [own]
+        return await asyncio.to_thread(self._load_snapshots, own)
+
+    # --- Exposition ---
+
+    def render(self, snapshots: List[dict]) -> str:
+        """Sum snapshots and format them in the Prometheus text format"""
+        lines = []
+
+        for name, metric in self.counters.items():
+            totals: Dict[tuple, float] = {}
+            for snapshot in snapshots:
+                for labels, value in snapshot["counters"].get(name, []):
+                    key = tuple(labels)
+                    totals[key] = totals.get(key, 0.0) + value
+
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(totals.items()):
+                lines.append(f"{name}{_labels(metric.labelnames, labels)} {_number(value)}")
+
+        for name, metric in self.histograms.items():
+            totals: Dict[tuple, list] = {}
+            for snapshot in snapshots:
+                for labels, counts, total in snapshot["histograms"].get(name, []):
+                    key = tuple(labels)
+                    if len(counts) != len(metric.buckets) + 1:
+                        continue  # written by a worker with different buckets
+                    merged = totals.setdefault(key, [[0] * len(counts), 0.0])
+                    merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                    merged[1] += total
+
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} histogram")
+            bounds = [_number(bound) for bound in metric.buckets] + ["+Inf"]
+            for labels, (counts, total) in sorted(totals.items()):
+                cumulative = 0
+                for bound, count in zip(bounds, counts):
+                    cumulative += count
+                    le = 'le="' + bound + '"'
+                    lines.append(f"{name}_bucket{_labels(metric.labelnames, labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(metric.labelnames, labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(metric.labelnames, labels)} {cumulative}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+metrics = Metrics()
+
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+)
+DB_QUERY_DURATION = metrics.histogram(
+    "db_query_duration_seconds", "Database statement execution time", ("pool", "operation"), DB_BUCKETS
+)
+UPLOAD_FILES = metrics.counter(
+    "upload_files_total", "Uploaded files by result (saved, deduplicated, rejected)", ("result",)
+)
+UPLOAD_BYTES = metrics.counter(
+    "upload_bytes_total", "Bytes of accepted uploads", ("result",)
+)
+IMAGE_PROCESSING_DURATION = metrics.histogram(
+    "image_processing_duration_seconds", "Image work in the process pool, queueing excluded", ("operation",)
+)
+TELEGRAM_REQUESTS = metrics.counter(
+    "telegram_requests_total", "Telegram Bot API calls by outcome", ("method", "outcome")
+)
+TELEGRAM_REQUEST_DURATION = metrics.histogram(
+    "telegram_request_duration_seconds", "Telegram Bot API call latency", ("method", "outcome")
+)
+EVENT_LOOP_LAG = metrics.histogram(
+    "event_loop_lag_seconds", "Delay of scheduled callbacks on the event loop", (), LOOP_LAG_BUCKETS
+)
+
+
+# --- Instrumentation ---
+
+class MetricsMiddleware:
+    """ASGI middleware: count and time requests per route template (/api/orders/{order_id})"""
+
+    def __init__(self, app):
+        self.app = app
+        self._endpoint_routes: Dict[int, str] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = self._route_template(scope)
+            labels = (scope["method"], route, str(status))
+            HTTP_REQUESTS.inc(*labels)
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, *labels)
+
+    def _route_template(self, scope) -> str:
+        # Template of the matched route, never the raw path (ids in paths
+        # would create a series per order)
+        route = scope.get("route")
+        if route is not None:
+            template = getattr(route, "path_format", None) or route.path
+            if route.path_regex.match(scope["path"]):
+                return template
+            # Newer FastAPI keeps included routers nested: the route only
+            # knows its own path, take the router prefix from the request path
+            segments = scope["path"].rstrip("/").split("/")
+            return "/".join(segments[:len(segments) - template.count("/")]) + template
+
+        # Plain Starlette routes and mounts (docs, static files)
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        key = id(endpoint)
+        template = self._endpoint_routes.get(key)
+        if template is None:
+            template = "unmatched"
+            for candidate in getattr(scope.get("app"), "routes", []):
+                if getattr(candidate, "endpoint", None) is endpoint or getattr(candidate, "app", None) is endpoint:
+                    template = getattr(candidate, "path_format", None) or candidate.path
+                    break
+            self._endpoint_routes[key] = template
+        return template
+
+
+def instrument_engine(async_engine, pool: str):
+    """Time every statement of the engine (SQLAlchemy cursor events)"""
+    from sqlalchemy import event
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["metrics_started"] = time.perf_counter()
+
+    @event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("metrics_started", None)
+        if started is None:
+            return
+        words = statement[:64].split(None, 1)
+        operation = words[0].upper() if words else "OTHER"
+        if operation not in DB_OPERATIONS:
+            operation = "OTHER"
+        DB_QUERY_DURATION.observe(time.perf_counter() - started, pool, operation)
+
+
+def record_upload(result: dict):
+    """Count a save_upload_file result"""
+    if not result.get("success"):
+        UPLOAD_FILES.inc("rejected")
+        return
+    outcome = "deduplicated" if result.get("deduplicated") else "saved"
+    UPLOAD_FILES.inc(outcome)
+    UPLOAD_BYTES.inc(outcome, amount=result.get("size") or 0)
+
+
+# Wrapper functions for imports
+async def render_metrics() -> str:
+    """Text for the /metrics endpoint"""
+    return metrics.render(await metrics.collect())
+
@@ -0,0 +1,26 @@
+"""
+Lightweight schema upkeep run at startup
+
+`create_all` only creates missing tables; indexes added to models of
+tables that already exist are created here.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.database import Base
+
+
+SCHEMA_LOCK_ID = 7218450931  # arbitrary, shared by all app instances
+
+
+def lock_schema(conn: Connection):
+    """Serialize startup schema upkeep of several app containers (PostgreSQL)"""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": SCHEMA_LOCK_ID})
+
+
+def ensure_indexes(conn: Connection):
+    """Create indexes declared on models that are missing in the database"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
@@ -1,11 +1,29 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Index, ForeignKey
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from datetime import datetime
 from app.core.database import Base
 
 
+# SQLite stores server_default timestamps without microseconds; binding values
+# in the same format keeps keyset comparisons on created_at exact
+CreatedAt = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite"
+)
+
+
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_orders_phone_created_at_id", "phone", "created_at", "id"),
+        Index("ix_orders_selected_date", "selected_date"),
+        Index("ix_orders_phone_selected_date_status", "phone", "selected_date", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     phone = Column(String(20), index=True)
@@ -14,7 +32,7 @@ class Order(Base):
     selected_date = Column(String(10))
     photos = Column(JSON, default=[])
     status = Column(String(20), default="new")
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(CreatedAt, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
 
@@ -36,3 +54,47 @@ class AvailableDate(Base):
     date = Column(String(10), unique=True, index=True)
     is_available = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class PhotoBlob(Base):
+    __tablename__ = "photo_blobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String(80), unique=True, index=True)
+    sha256 = Column(String(64), index=True)
+    size = Column(Integer)
+    ref_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class OrderPhoto(Base):
+    """One photo of an order (Order.photos keeps the filenames for responses)"""
+    __tablename__ = "order_photos"
+    __table_args__ = (
+        Index("ix_order_photos_order_id_position", "order_id", "position"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, default=0)
+    filename = Column(String(80), index=True)
+    size = Column(Integer)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    sha256 = Column(String(64), index=True)
+    mime_type = Column(String(50), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50))
+    payload = Column(JSON, default={})
+    status = Column(String(20), default="pending", index=True)
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    last_error = Column(String(1000), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
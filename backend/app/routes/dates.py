@@ -7,6 +7,9 @@ from datetime import datetime
 from app.core.database import get_db
 from app.schemas.schemas import AvailableDateResponse, AvailableDateCreate, MessageResponse
 from app.models.models import AvailableDate
+from app.services.availability_cache import invalidate_availability_cache
+from app.services.availability_index import availability_index
+from app.services.calendar_ingest import expand_dates, ingest_dates
 
 router = APIRouter()
 
@@ -26,7 +29,7 @@ async def get_available_dates(
         today = datetime.now().strftime("%Y-%m-%d")
         
         stmt = select(AvailableDate).where(
-            AvailableDate.is_available == 1,
+            AvailableDate.is_available.is_(True),
             AvailableDate.date >= today
         ).order_by(AvailableDate.date)
         
@@ -123,6 +126,8 @@ async def create_available_date(
         
         db.add(new_date)
         await db.commit()
+        invalidate_availability_cache()
+        availability_index.invalidate()
         await db.refresh(new_date)
         
         return AvailableDateResponse(
@@ -160,6 +165,8 @@ async def update_available_date(
         
         date.is_available = 1 if is_available else 0
         await db.commit()
+        invalidate_availability_cache()
+        availability_index.invalidate()
         await db.refresh(date)
         
         return AvailableDateResponse(
@@ -193,6 +200,8 @@ async def delete_available_date(
         
         await db.delete(date)
         await db.commit()
+        invalidate_availability_cache()
+        availability_index.invalidate()
         
         return MessageResponse(
             message="Date has been deleted",
@@ -221,8 +230,6 @@ async def create_bulk_dates(
     - **skip_weekends**: Skip weekends (default: true)
     """
     try:
-        from datetime import timedelta
-        
         # Parse dates
         start = datetime.strptime(start_date, "%Y-%m-%d")
         end = datetime.strptime(end_date, "%Y-%m-%d")
@@ -233,38 +240,21 @@ async def create_bulk_dates(
                 detail="Start date must be before end date"
             )
         
-        # Generate dates
-        created = 0
-        skipped = 0
-        current = start
-        
-        while current <= end:
-            # Skip weekends if requested
-            if skip_weekends and current.weekday() >= 5:  # 5 = Saturday, 6 = Sunday
-                skipped += 1
-                current += timedelta(days=1)
-                continue
-            
-            date_str = current.strftime("%Y-%m-%d")
-            
-            # Check if date already exists
-            stmt = select(AvailableDate).where(AvailableDate.date == date_str)
-            result = await db.execute(stmt)
-            existing = result.scalar_one_or_none()
-            
-            if not existing:
-                new_date = AvailableDate(
-                    date=date_str,
-                    is_available=1
-                )
-                db.add(new_date)
-                created += 1
-            else:
-                skipped += 1
-            
-            current += timedelta(days=1)
+        # Generate dates and insert them in one statement
+        weekdays = range(5) if skip_weekends else range(7)  # 5 = Saturday, 6 = Sunday
+        try:
+            dates = expand_dates(ranges=[(start.date(), end.date())], weekdays=weekdays)
+        except ValueError as e:
+            # Range over MAX_DATES days
+            raise HTTPException(status_code=400, detail=str(e))
+        result = await ingest_dates(db, dates)
+        
+        created = result["created"]
+        skipped = (end - start).days + 1 - created
         
         await db.commit()
+        invalidate_availability_cache()
+        availability_index.invalidate()
         
         return MessageResponse(
             message=f"Created {created} dates, skipped {skipped}",
@@ -295,7 +285,7 @@ async def get_available_dates(
         today = datetime.now().strftime("%Y-%m-%d")
         
         stmt = select(AvailableDate).where(
-            AvailableDate.is_available == 1,
+            AvailableDate.is_available.is_(True),
             AvailableDate.date >= today
         ).order_by(AvailableDate.date)
         
@@ -392,6 +382,8 @@ async def create_available_date(
         
         db.add(new_date)
         await db.commit()
+        invalidate_availability_cache()
+        availability_index.invalidate()
         await db.refresh(new_date)
         
         return AvailableDateResponse(
@@ -429,6 +421,8 @@ async def update_available_date(
         
         date.is_available = 1 if is_available else 0
         await db.commit()
+        invalidate_availability_cache()
+        availability_index.invalidate()
         await db.refresh(date)
         
         return AvailableDateResponse(
@@ -462,6 +456,8 @@ async def delete_available_date(
         
         await db.delete(date)
         await db.commit()
+        invalidate_availability_cache()
+        availability_index.invalidate()
         
         return MessageResponse(
             message="Date has been deleted",
@@ -490,8 +486,6 @@ async def create_bulk_dates(
     - **skip_weekends**: Skip weekends (default: true)
     """
     try:
-        from datetime import timedelta
-        
         # Parse dates
         start = datetime.strptime(start_date, "%Y-%m-%d")
         end = datetime.strptime(end_date, "%Y-%m-%d")
@@ -502,38 +496,21 @@ async def create_bulk_dates(
                 detail="Start date must be before end date"
             )
         
-        # Generate dates
-        created = 0
-        skipped = 0
-        current = start
-        
-        while current <= end:
-            # Skip weekends if requested
-            if skip_weekends and current.weekday() >= 5:  # 5 = Saturday, 6 = Sunday
-                skipped += 1
-                current += timedelta(days=1)
-                continue
-            
-            date_str = current.strftime("%Y-%m-%d")
-            
-            # Check if date already exists
-            stmt = select(AvailableDate).where(AvailableDate.date == date_str)
-            result = await db.execute(stmt)
-            existing = result.scalar_one_or_none()
-            
-            if not existing:
-                new_date = AvailableDate(
-                    date=date_str,
-                    is_available=1
-                )
-                db.add(new_date)
-                created += 1
-            else:
-                skipped += 1
-            
-            current += timedelta(days=1)
+        # Generate dates and insert them in one statement
+        weekdays = range(5) if skip_weekends else range(7)  # 5 = Saturday, 6 = Sunday
+        try:
+            dates = expand_dates(ranges=[(start.date(), end.date())], weekdays=weekdays)
+        except ValueError as e:
+            # Range over MAX_DATES days
+            raise HTTPException(status_code=400, detail=str(e))
+        result = await ingest_dates(db, dates)
+        
+        created = result["created"]
+        skipped = (end - start).days + 1 - created
         
         await db.commit()
+        invalidate_availability_cache()
+        availability_index.invalidate()
         
         return MessageResponse(
             message=f"Created {created} dates, skipped {skipped}",
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional, Union, Any
+from pydantic import BaseModel, TypeAdapter
+from typing import List, Optional, Any, Dict
 from datetime import datetime
 
 
@@ -9,7 +9,7 @@ class OrderResponse(BaseModel):
     address: str
     description: str
     selected_date: str
-    photos: Union[List[str], dict, Any] = []
+    photos: Any = []  # list of filenames; legacy rows may hold other JSON, passed through as is
     status: str
     created_at: datetime
     updated_at: Optional[datetime]
@@ -52,10 +52,43 @@ class AvailableDateResponse(BaseModel):
         from_attributes = True
 
 
+class AvailableDateRangeResponse(BaseModel):
+    start: str
+    end: str
+    dates: List[str]
+    months: Dict[str, int]
+
+
 class AvailableDateCreate(BaseModel):
     date: str
     is_available: bool = True
 
 
+class DateRange(BaseModel):
+    start: str
+    end: str
+
+
+class AvailableDateBulkRequest(BaseModel):
+    ranges: List[DateRange] = []
+    dates: List[str] = []
+    weekdays: List[int] = [0, 1, 2, 3, 4]
+    exclude: List[str] = []
+    is_available: bool = True
+
+
+class AvailableDateBulkResponse(BaseModel):
+    created: int
+    skipped: int
+    total: int
+    created_dates: List[str] = []
+
+
 class MessageResponse(BaseModel):
     message: str
+
+
+# Precompiled adapters for hot endpoints (see app.core.json_response)
+OrderAdapter = TypeAdapter(OrderResponse)
+OrderListAdapter = TypeAdapter(List[OrderResponse])
+AvailableDateListAdapter = TypeAdapter(List[AvailableDateResponse])
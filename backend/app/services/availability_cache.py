@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Optional
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.file_response import etag_matches
+from app.models.models import AvailableDate
+
+
+class AvailabilityCache:
+    """
+    Process-local cache of the public "available dates" response
+
+    Holds the serialized JSON body and its ETag. The entry is keyed by the
+    current day, so it rolls over at midnight by itself, and is dropped by
+    every write in the dates routers. AVAILABILITY_CACHE_TTL bounds how long
+    another worker process can serve data changed by a different process.
+    """
+
+    def __init__(self):
+        self.ttl = settings.AVAILABILITY_CACHE_TTL
+        self.cache_control = (
+            f"public, max-age={settings.AVAILABILITY_MAX_AGE}, "
+            f"stale-while-revalidate={settings.AVAILABILITY_STALE_WHILE_REVALIDATE}"
+        )
+        self.version = 0
+        self._day: Optional[str] = None
+        self._built_at = 0.0
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        """Drop cached response (call after every write to available_dates)"""
+        self.version += 1
+        self._body = None
+        self._etag = None
+
+    def _is_fresh(self, today: str) -> bool:
+        return (
+            self._body is not None
+            and self._day == today
+            and time.monotonic() - self._built_at < self.ttl
+        )
+
+    async def _build(self, db: AsyncSession, today: str):
+        version = self.version
+
+        stmt = select(AvailableDate.id, AvailableDate.date).where(
+            AvailableDate.is_available.is_(True),
+            AvailableDate.date >= today
+        ).order_by(AvailableDate.date)
+        result = await db.execute(stmt)
+
+        body = json.dumps(
+            [{"id": row.id, "date": row.date, "is_available": True} for row in result],
+            ensure_ascii=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+
+        # A write committed while we were querying - don't cache possibly stale data
+        if version != self.version:
+            return body, None
+
+        self._day = today
+        self._built_at = time.monotonic()
+        self._body = body
+        self._etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        return self._body, self._etag
+
+    async def get_body(self, db: AsyncSession):
+        """Return (body, etag), rebuilding from DB at most once concurrently"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        if self._is_fresh(today):
+            return self._body, self._etag
+
+        async with self._lock:
+            if self._is_fresh(today):
+                return self._body, self._etag
+            return await self._build(db, today)
+
+    async def response(self, request: Request, db: AsyncSession) -> Response:
+        """Cached JSON response with ETag/304 and Cache-Control"""
+        body, etag = await self.get_body(db)
+        if etag is None:
+            etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Singleton instance
+availability_cache = AvailabilityCache()
+
+
+# Wrapper functions for imports
+def invalidate_availability_cache():
+    """Wrapper for dropping cached available dates after a write"""
+    availability_cache.invalidate()
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.models import AvailableDate
+
+
+YEAR_BYTES = 46  # 366 bits
+
+
+class AvailabilityIndex:
+    """
+    Calendar bitsets of available_dates, one per year
+
+    Bit N of a year is day-of-year N+1. `open` marks available days,
+    `known` marks days that have a row at all, so a day explicitly closed
+    by the admin can be told apart from a day that was never added.
+    Rebuilt from the table on first use and after AVAILABILITY_CACHE_TTL
+    (other worker processes may have written), updated in place on writes.
+    """
+
+    def __init__(self):
+        self.ttl = settings.AVAILABILITY_CACHE_TTL
+        self.open: Dict[int, bytearray] = {}
+        self.known: Dict[int, bytearray] = {}
+        self._built_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _position(day: date):
+        return day.year, day.timetuple().tm_yday - 1
+
+    @staticmethod
+    def _parse(value) -> Optional[date]:
+        if isinstance(value, date):
+            return value
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except (TypeError, ValueError):
+            return None
+
+    def _set_bit(self, bitsets: Dict[int, bytearray], day: date, value: bool):
+        year, pos = self._position(day)
+        bits = bitsets.setdefault(year, bytearray(YEAR_BYTES))
+        if value:
+            bits[pos >> 3] |= 1 << (pos & 7)
+        else:
+            bits[pos >> 3] &= ~(1 << (pos & 7)) & 0xFF
+
+    def _get_bit(self, bitsets: Dict[int, bytearray], day: date) -> bool:
+        year, pos = self._position(day)
+        bits = bitsets.get(year)
+        return bool(bits and bits[pos >> 3] & (1 << (pos & 7)))
+
+    async def rebuild(self, db: AsyncSession):
+        """Load all dates from the table"""
+        result = await db.execute(select(AvailableDate.date, AvailableDate.is_available))
+
+        self.open = {}
+        self.known = {}
+        for date_str, is_available in result:
+            day = self._parse(date_str)
+            if day is None:
+                continue
+            self._set_bit(self.known, day, True)
+            self._set_bit(self.open, day, bool(is_available))
+
+        self._built_at = time.monotonic()
+
+    async def ensure_loaded(self, db: AsyncSession):
+        """Rebuild index if it was never built or is older than TTL"""
+        if self._built_at is not None and time.monotonic() - self._built_at < self.ttl:
+            return
+        async with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at >= self.ttl:
+                await self.rebuild(db)
+
+    def invalidate(self):
+        """Force rebuild on next use (for writes that don't track single days)"""
+        self._built_at = None
+
+    def set(self, date_str: str, is_available: bool):
+        """Update one day after a write"""
+        day = self._parse(date_str)
+        if day is None:
+            return
+        self._set_bit(self.known, day, True)
+        self._set_bit(self.open, day, is_available)
+
+    def remove(self, date_str: str):
+        """Forget one day after its row was deleted"""
+        day = self._parse(date_str)
+        if day is None:
+            return
+        self._set_bit(self.known, day, False)
+        self._set_bit(self.open, day, False)
+
+    def is_open(self, date_str: str) -> bool:
+        """O(1): date exists and is available"""
+        day = self._parse(date_str)
+        return day is not None and self._get_bit(self.open, day)
+
+    def is_closed(self, date_str: str) -> bool:
+        """O(1): date exists but was marked unavailable"""
+        day = self._parse(date_str)
+        return day is not None and self._get_bit(self.known, day) and not self._get_bit(self.open, day)
+
+    def iter_open(self, start: date, end: date) -> Iterator[date]:
+        """Open days in [start, end], skipping empty bytes (8 days) at once"""
+        for year in range(start.year, end.year + 1):
+            bits = self.open.get(year)
+            if not bits:
+                continue
+
+            year_start = date(year, 1, 1)
+            first = (start - year_start).days if year == start.year else 0
+            last = (end - year_start).days if year == end.year else YEAR_BYTES * 8 - 1
+
+            pos = first
+            while pos <= last:
+                byte = bits[pos >> 3]
+                if byte == 0:
+                    pos = (pos | 7) + 1
+                    continue
+                if byte & (1 << (pos & 7)):
+                    day = year_start + timedelta(days=pos)
+                    if day.year != year:
+                        break
+                    yield day
+                pos += 1
+
+    def range(self, start: date, end: date, limit: Optional[int] = None) -> List[str]:
+        """Open days in range as YYYY-MM-DD, at most `limit` of them"""
+        result = []
+        for day in self.iter_open(start, end):
+            result.append(day.strftime("%Y-%m-%d"))
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+    def month_mask(self, year: int, month: int) -> int:
+        """Open days of a month as int bitmask (bit 0 = 1st day of month)"""
+        mask = 0
+        month_start = date(year, month, 1)
+        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        for day in self.iter_open(month_start, month_end):
+            mask |= 1 << (day.day - 1)
+        return mask
+
+    def months(self, start: date, end: date) -> Dict[str, int]:
+        """Month bitmasks for all months touching [start, end]"""
+        result = {}
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            result[f"{year:04d}-{month:02d}"] = self.month_mask(year, month)
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return result
+
+
+# Singleton instance
+availability_index = AvailabilityIndex()
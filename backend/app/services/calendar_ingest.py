@@ -0,0 +1,137 @@
+import csv
+import io
+import re
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.dialect import upsert
+from app.models.models import AvailableDate
+
+
+WORKDAYS = [0, 1, 2, 3, 4]
+MAX_DATES = 3660  # ~10 years per request
+MAX_CALENDAR_FILE_SIZE = 1024 * 1024
+
+_ICS_DATE_RE = re.compile(r"^(DTSTART|DTEND)[^:]*:(\d{8})", re.MULTILINE)
+
+
+def parse_date(value: str) -> date:
+    """Parse YYYY-MM-DD (raises ValueError)"""
+    return datetime.strptime(value.strip(), "%Y-%m-%d").date()
+
+
+def expand_dates(
+    ranges: Iterable[Tuple[date, date]] = (),
+    dates: Iterable[date] = (),
+    weekdays: Optional[Iterable[int]] = None,
+    exclude: Iterable[date] = ()
+) -> List[date]:
+    """
+    Expand ranges into single days
+
+    Days of ranges are kept only if their weekday (Monday = 0) is in
+    `weekdays`; explicit `dates` are always kept; `exclude` wins over both.
+    """
+    allowed = set(WORKDAYS if weekdays is None else weekdays)
+    if not allowed <= set(range(7)):
+        raise ValueError("Weekdays must be between 0 (Monday) and 6 (Sunday)")
+    excluded = set(exclude)
+    result: Set[date] = set()
+
+    for start, end in ranges:
+        if end < start:
+            raise ValueError("Start date must be before end date")
+        if (end - start).days >= MAX_DATES:
+            raise ValueError(f"Range too long (max. {MAX_DATES} days)")
+
+        current = start
+        while current <= end:
+            if current.weekday() in allowed:
+                result.add(current)
+            current += timedelta(days=1)
+
+    result.update(dates)
+    result -= excluded
+
+    if len(result) > MAX_DATES:
+        raise ValueError(f"Too many dates (max. {MAX_DATES})")
+    return sorted(result)
+
+
+def parse_csv(content: str) -> Tuple[List[Tuple[date, date]], List[date]]:
+    """
+    Parse CSV calendar: one `YYYY-MM-DD` or `YYYY-MM-DD,YYYY-MM-DD` (range) per row
+
+    Header rows and rows starting with # are skipped.
+    """
+    ranges, dates = [], []
+    for row in csv.reader(io.StringIO(content)):
+        cells = [cell.strip() for cell in row if cell.strip()]
+        if not cells or cells[0].startswith("#"):
+            continue
+        try:
+            start = parse_date(cells[0])
+        except ValueError:
+            continue  # header
+        if len(cells) > 1:
+            ranges.append((start, parse_date(cells[1])))
+        else:
+            dates.append(start)
+    return ranges, dates
+
+
+def parse_ics(content: str) -> List[date]:
+    """Parse all-day events of an iCalendar file (e.g. public holidays)"""
+    result = []
+    content = content.replace("\r\n", "\n")
+    for event in content.split("BEGIN:VEVENT")[1:]:
+        event = event.split("END:VEVENT")[0]
+        found = dict(_ICS_DATE_RE.findall(event))
+        if "DTSTART" not in found:
+            continue
+
+        start = datetime.strptime(found["DTSTART"], "%Y%m%d").date()
+        # DTEND of all-day events is exclusive
+        end = datetime.strptime(found["DTEND"], "%Y%m%d").date() - timedelta(days=1) if "DTEND" in found else start
+        current = start
+        while current <= max(start, end):
+            result.append(current)
+            current += timedelta(days=1)
+    return result
+
+
+def parse_calendar_file(filename: str, content: bytes) -> Tuple[List[Tuple[date, date]], List[date]]:
+    """Parse uploaded CSV or ICS file into (ranges, dates)"""
+    text = content.decode("utf-8-sig")
+    if filename.lower().endswith(".ics") or "BEGIN:VCALENDAR" in text[:200]:
+        return [], parse_ics(text)
+    return parse_csv(text)
+
+
+async def ingest_dates(db: AsyncSession, dates: List[date], is_available: bool = True) -> dict:
+    """
+    Insert dates in one INSERT ... ON CONFLICT DO NOTHING
+
+    Existing dates are left untouched. Runs inside the caller's transaction
+    (caller commits) and reports created / skipped counts.
+    """
+    if not dates:
+        return {"created": 0, "skipped": 0, "total": 0, "created_dates": []}
+
+    stmt = upsert(db, AvailableDate).on_conflict_do_nothing(
+        index_elements=[AvailableDate.date]
+    ).returning(AvailableDate.date)
+
+    result = await db.execute(stmt, [
+        {"date": day.strftime("%Y-%m-%d"), "is_available": is_available}
+        for day in dates
+    ])
+    created_dates = sorted(result.scalars().all())
+
+    return {
+        "created": len(created_dates),
+        "skipped": len(dates) - len(created_dates),
+        "total": len(dates),
+        "created_dates": created_dates,
+    }
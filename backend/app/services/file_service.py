@@ -1,11 +1,27 @@
 import os
 import uuid
+import hashlib
+import asyncio
+from collections import Counter
 from typing import List, Optional
 from fastapi import UploadFile
-from PIL import Image
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from PIL import Image, ImageOps
 import aiofiles
+import aiofiles.os
 
 from app.core.config import settings
+from app.core.dialect import upsert, lock_keys
+from app.core.metrics import record_upload
+from app.models.models import PhotoBlob, OrderPhoto
+from app.services.image_executor import (
+    image_executor, _optimize_image, _create_thumbnail, _get_file_info, _render_derivative
+)
+
+
+def _photo_lock_key(filename: str) -> str:
+    return f"photo:{filename}"
 
 
 class FileService:
@@ -14,6 +30,11 @@ class FileService:
         self.photos_dir = os.path.join(self.upload_dir, "photos")
         self.temp_dir = os.path.join(self.upload_dir, "temp")
         self.max_size = settings.MAX_FILE_SIZE
+        self.chunk_size = settings.UPLOAD_CHUNK_SIZE
+        self.concurrency_per_request = settings.UPLOAD_CONCURRENCY_PER_REQUEST
+        
+        # Shared by all requests of this process
+        self.global_semaphore = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY_GLOBAL)
         self.allowed_extensions = settings.ALLOWED_EXTENSIONS
         
         # Ensure directories exist
@@ -56,42 +77,131 @@ class FileService:
         unique_id = uuid.uuid4().hex
         return f"{unique_id}.{ext}"
     
+    def content_filename(self, digest: str, original_filename: str) -> str:
+        """Content-addressed filename: sha256 of the bytes + normalized extension"""
+        ext = original_filename.split('.')[-1].lower()
+        if ext == "jpeg":
+            ext = "jpg"
+        return f"{digest}.{ext}"
+    
+    @staticmethod
+    def probe_image(fileobj) -> dict:
+        """Width, height and mime type from the image header (pixels are not decoded)"""
+        try:
+            fileobj.seek(0)
+            with Image.open(fileobj) as img:
+                return {
+                    "width": img.width,
+                    "height": img.height,
+                    "mime_type": Image.MIME.get(img.format),
+                }
+        except Exception:
+            return {"width": None, "height": None, "mime_type": None}
+    
+    async def _stream_upload(self, file: UploadFile, directory: str) -> dict:
+        """
+        Copy upload into a .part file in fixed-size chunks, hashing as it goes
+        
+        One pass over the upload. Stops at the size cap; the .part file is
+        removed on any failure, on success the caller moves or removes it.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        temp_path = os.path.join(directory, f"{uuid.uuid4().hex}.part")
+        complete = False
+        
+        try:
+            await file.seek(0)
+            async with aiofiles.open(temp_path, 'wb') as f:
+                while True:
+                    chunk = await file.read(self.chunk_size)
+                    if not chunk:
+                        complete = True
+                        break
+                    
+                    size += len(chunk)
+                    if size > self.max_size:
+                        break
+                    
+                    digest.update(chunk)
+                    await f.write(chunk)
+        finally:
+            if not complete and await aiofiles.os.path.exists(temp_path):
+                await aiofiles.os.remove(temp_path)
+        
+        if not complete:
+            max_mb = self.max_size / 1024 / 1024
+            return {"valid": False, "error": f"Plik jest za duży. Maksymalny rozmiar: {max_mb}MB"}
+        
+        return {"valid": True, "sha256": digest.hexdigest(), "size": size, "temp_path": temp_path}
+    
+    async def _write_upload(self, file: UploadFile, filepath: str):
+        """Stream upload into a .part file and move it into place (atomic rename)"""
+        temp_path = f"{filepath}.{uuid.uuid4().hex}.part"
+        try:
+            await file.seek(0)
+            async with aiofiles.open(temp_path, 'wb') as f:
+                while True:
+                    chunk = await file.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    await f.write(chunk)
+            
+            await aiofiles.os.replace(temp_path, filepath)
+        finally:
+            if await aiofiles.os.path.exists(temp_path):
+                await aiofiles.os.remove(temp_path)
+    
     async def save_upload_file(self, file: UploadFile, directory: str = None) -> dict:
-        """Save uploaded file to disk"""
+        """
+        Save uploaded file to disk under its content hash
+        
+        The upload is read once: streamed into a .part file next to the final
+        location while it is hashed (chunked, size-capped). New content is
+        moved into place with an atomic rename; when the same bytes are
+        already stored the .part file is removed instead.
+        """
         try:
             # Validate file
             validation = self.validate_file(file)
             if not validation["valid"]:
                 return {"success": False, "error": validation["error"]}
             
-            # Generate unique filename
-            filename = self.generate_unique_filename(file.filename)
-            
             # Determine save directory
             save_dir = directory if directory else self.photos_dir
-            filepath = os.path.join(save_dir, filename)
             
-            # Save file
-            async with aiofiles.open(filepath, 'wb') as f:
-                content = await file.read()
-                
-                # Check actual size
-                if len(content) > self.max_size:
-                    max_mb = self.max_size / 1024 / 1024
-                    return {
-                        "success": False,
-                        "error": f"Plik jest za duży. Maksymalny rozmiar: {max_mb}MB"
-                    }
-                
-                await f.write(content)
+            hashed = await self._stream_upload(file, save_dir)
+            if not hashed["valid"]:
+                return {"success": False, "error": hashed["error"]}
+            temp_path = hashed["temp_path"]
             
-            return {
+            filename = self.content_filename(hashed["sha256"], file.filename)
+            filepath = os.path.join(save_dir, filename)
+            probed = await asyncio.to_thread(self.probe_image, file.file)
+            
+            result = {
                 "success": True,
                 "filename": filename,
                 "filepath": filepath,
-                "size": len(content)
+                "size": hashed["size"],
+                "sha256": hashed["sha256"],
+                **probed,
+                "deduplicated": False
             }
             
+            try:
+                # Same bytes already stored - keep that file. Not a guarantee
+                # it survives: acquire_photos re-checks under the lock.
+                if await aiofiles.os.path.exists(filepath):
+                    result["deduplicated"] = True
+                else:
+                    await aiofiles.os.replace(temp_path, filepath)
+            finally:
+                if await aiofiles.os.path.exists(temp_path):
+                    await aiofiles.os.remove(temp_path)
+            
+            return result
+            
         except Exception as e:
             print(f"Error saving file: {e}")
             return {
@@ -115,14 +225,30 @@ class FileService:
             saved_files = []
             errors = []
             
-            for file in files:
-                result = await self.save_upload_file(file)
-                
+            # Save files concurrently, bounded per request and per process
+            request_semaphore = asyncio.Semaphore(self.concurrency_per_request)
+            
+            async def save_bounded(file: UploadFile) -> dict:
+                async with request_semaphore, self.global_semaphore:
+                    result = await self.save_upload_file(file)
+                record_upload(result)
+                return result
+            
+            results = await asyncio.gather(*(save_bounded(file) for file in files))
+            
+            for file, result in zip(files, results):
                 if result["success"]:
                     saved_files.append({
                         "filename": result["filename"],
                         "filepath": result["filepath"],
-                        "size": result["size"]
+                        "size": result["size"],
+                        "sha256": result["sha256"],
+                        "width": result["width"],
+                        "height": result["height"],
+                        "mime_type": result["mime_type"],
+                        "deduplicated": result["deduplicated"],
+                        # Kept to restore the file if it is purged before the order commits
+                        "upload": file
                     })
                 else:
                     errors.append({
@@ -145,6 +271,127 @@ class FileService:
                 "error": f"Błąd podczas zapisywania plików: {str(e)}"
             }
     
+    async def acquire_photos(self, db: AsyncSession, saved_files: List[dict]):
+        """
+        Add one reference per saved file (part of the caller's transaction)
+        
+        The files were saved (or found already stored) before any reference
+        was held, so a concurrent delete may have purged them since. Once the
+        references and photo locks are held nothing can purge them any more
+        (see purge_photos): files missing at that point are written again
+        from the upload.
+        """
+        if not saved_files:
+            return
+        await lock_keys(db, *(_photo_lock_key(saved["filename"]) for saved in saved_files))
+        
+        for saved in saved_files:
+            stmt = upsert(db, PhotoBlob).values(
+                filename=saved["filename"],
+                sha256=saved["sha256"],
+                size=saved["size"],
+                ref_count=1
+            ).on_conflict_do_update(
+                index_elements=[PhotoBlob.filename],
+                set_={"ref_count": PhotoBlob.ref_count + 1}
+            )
+            await db.execute(stmt)
+        
+        for saved in saved_files:
+            if await aiofiles.os.path.exists(saved["filepath"]):
+                continue
+            upload = saved.get("upload")
+            if upload is None:
+                raise RuntimeError(f"Photo {saved['filename']} was removed and cannot be restored")
+            print(f"Photo {saved['filename']} was purged concurrently, writing it again")
+            await self._write_upload(upload, saved["filepath"])
+    
+    async def add_order_photos(self, db: AsyncSession, order_id: int, saved_files: List[dict]):
+        """Record per-photo metadata of a new order (part of the caller's transaction)"""
+        if not saved_files:
+            return
+        await db.execute(insert(OrderPhoto), [
+            {
+                "order_id": order_id,
+                "position": position,
+                "filename": saved["filename"],
+                "size": saved["size"],
+                "width": saved.get("width"),
+                "height": saved.get("height"),
+                "sha256": saved["sha256"],
+                "mime_type": saved.get("mime_type"),
+            }
+            for position, saved in enumerate(saved_files)
+        ])
+    
+    async def remove_order_photos(self, db: AsyncSession, order_id: int):
+        """Drop photo metadata of a deleted order (part of the caller's transaction)"""
+        await db.execute(delete(OrderPhoto).where(OrderPhoto.order_id == order_id))
+    
+    async def release_photos(self, db: AsyncSession, filenames: List[str]) -> List[str]:
+        """
+        Drop one reference per filename (part of the caller's transaction)
+        
+        Returns filenames that are no longer referenced by any order; pass
+        them to purge_photos after commit. Files without a blob row (stored
+        before content addressing) are always returned.
+        """
+        counts = Counter(filenames)
+        if not counts:
+            return []
+        
+        for filename, count in counts.items():
+            await db.execute(
+                update(PhotoBlob)
+                .where(PhotoBlob.filename == filename)
+                .values(ref_count=PhotoBlob.ref_count - count)
+            )
+        
+        result = await db.execute(
+            select(PhotoBlob.filename, PhotoBlob.ref_count).where(PhotoBlob.filename.in_(counts))
+        )
+        remaining = {filename: ref_count for filename, ref_count in result.all()}
+        orphaned = [f for f in counts if remaining.get(f, 0) <= 0]
+        
+        await db.execute(
+            delete(PhotoBlob).where(PhotoBlob.filename.in_(orphaned))
+        )
+        
+        return orphaned
+    
+    async def purge_photos(self, db: AsyncSession, filenames: List[str]) -> List[str]:
+        """
+        Unlink files that no committed order references
+        
+        Runs in its own short transaction: the photo locks are taken and the
+        blob rows re-checked right before unlinking, and the lock is held
+        until the files are gone. An order that references the file commits
+        either before (row found, file kept) or after (acquire_photos finds
+        the file missing and writes it again). Returns unlinked filenames.
+        """
+        filenames = list(dict.fromkeys(filenames))
+        if not filenames:
+            return []
+        
+        await lock_keys(db, *(_photo_lock_key(filename) for filename in filenames))
+        result = await db.execute(
+            select(PhotoBlob.filename).where(PhotoBlob.filename.in_(filenames))
+        )
+        referenced = set(result.scalars().all())
+        unreferenced = [f for f in filenames if f not in referenced]
+        
+        try:
+            if unreferenced:
+                await asyncio.to_thread(
+                    self.delete_multiple_files,
+                    [os.path.join(self.photos_dir, filename) for filename in unreferenced]
+                )
+        finally:
+            # Releases the write lock (SQLite) / photo locks (PostgreSQL)
+            await db.commit()
+        
+        return unreferenced
+    
     def delete_file(self, filepath: str) -> bool:
         """Delete file from disk"""
         try:
@@ -227,6 +474,45 @@ class FileService:
             print(f"Error creating thumbnail: {e}")
             return None
     
+    def render_derivative(
+        self,
+        filepath: str,
+        target_path: str,
+        width: int,
+        image_format: str = "JPEG",
+        quality: int = 80
+    ) -> Optional[int]:
+        """Render resized copy of image in given format, returns its size in bytes"""
+        try:
+            with Image.open(filepath) as img:
+                img = ImageOps.exif_transpose(img)
+                
+                # JPEG has no alpha channel
+                if image_format == "JPEG" and img.mode not in ('RGB', 'L'):
+                    img = img.convert('RGB')
+                elif img.mode not in ('RGB', 'RGBA', 'L'):
+                    img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+                
+                # Resize only down, keeping aspect ratio
+                if img.width > width:
+                    height = max(1, round(img.height * width / img.width))
+                    img = img.resize((width, height), Image.Resampling.LANCZOS)
+                
+                # Write next to target and move into place atomically
+                temp_path = f"{target_path}.{uuid.uuid4().hex}.part"
+                try:
+                    img.save(temp_path, format=image_format, optimize=True, quality=quality)
+                    os.replace(temp_path, target_path)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+            
+            return os.path.getsize(target_path)
+            
+        except Exception as e:
+            print(f"Error rendering image derivative: {e}")
+            return None
+    
     def get_file_info(self, filepath: str) -> dict:
         """Get file information"""
         try:
@@ -259,6 +545,40 @@ class FileService:
             print(f"Error getting file info: {e}")
             return {"exists": False, "error": str(e)}
 
+    
+    async def optimize_image_async(
+        self,
+        filepath: str,
+        max_width: int = 1920,
+        max_height: int = 1920,
+        quality: int = 85
+    ) -> bool:
+        """Optimize image in the image process pool"""
+        return await image_executor.run(_optimize_image, filepath, max_width, max_height, quality)
+    
+    async def create_thumbnail_async(
+        self,
+        filepath: str,
+        thumbnail_size: tuple = (300, 300)
+    ) -> Optional[str]:
+        """Create thumbnail in the image process pool"""
+        return await image_executor.run(_create_thumbnail, filepath, thumbnail_size)
+    
+    async def get_file_info_async(self, filepath: str) -> dict:
+        """Get file information in the image process pool"""
+        return await image_executor.run(_get_file_info, filepath)
+    
+    async def render_derivative_async(
+        self,
+        filepath: str,
+        target_path: str,
+        width: int,
+        image_format: str = "JPEG",
+        quality: int = 80
+    ) -> Optional[int]:
+        """Render resized copy of image in the image process pool"""
+        return await image_executor.run(_render_derivative, filepath, target_path, width, image_format, quality)
+
 
 # Singleton instance
 file_service = FileService()
@@ -270,6 +590,31 @@ async def save_multiple_files(files: List[UploadFile], max_files: int = 5) -> di
     return await file_service.save_multiple_files(files, max_files)
 
 
+async def acquire_photos(db: AsyncSession, saved_files: List[dict]):
+    """Wrapper for adding photo references for a new order"""
+    await file_service.acquire_photos(db, saved_files)
+
+
+async def add_order_photos(db: AsyncSession, order_id: int, saved_files: List[dict]):
+    """Wrapper for recording photo metadata of a new order"""
+    await file_service.add_order_photos(db, order_id, saved_files)
+
+
+async def remove_order_photos(db: AsyncSession, order_id: int):
+    """Wrapper for dropping photo metadata of a deleted order"""
+    await file_service.remove_order_photos(db, order_id)
+
+
+async def release_photos(db: AsyncSession, filenames: List[str]) -> List[str]:
+    """Wrapper for dropping photo references, returns filenames safe to delete"""
+    return await file_service.release_photos(db, filenames)
+
+
+async def purge_photos(db: AsyncSession, filenames: List[str]) -> List[str]:
+    """Wrapper for unlinking photos no committed order refers to"""
+    return await file_service.purge_photos(db, filenames)
+
+
 def delete_multiple_files(filenames: List[str]) -> dict:
     """Wrapper for deleting multiple files by filename (builds full paths automatically)"""
     # Convert filenames to full paths in photos directory
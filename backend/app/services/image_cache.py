@@ -0,0 +1,183 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from PIL import features
+
+from app.core.config import settings
+from app.services.file_service import file_service
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, the lock file is only a placeholder
+    fcntl = None
+
+
+# format name -> (Pillow format, file extension, media type)
+IMAGE_FORMATS = {
+    "avif": ("AVIF", "avif", "image/avif"),
+    "webp": ("WEBP", "webp", "image/webp"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+}
+
+# Files used this recently are never evicted (covers the time until a response opens them)
+EVICT_GRACE_SECONDS = 60
+# Hits refresh atime at most this often
+TOUCH_INTERVAL_SECONDS = 10
+LOCK_FILE = ".lock"
+
+
+class ImageDerivativeCache:
+    """
+    Disk cache of resized photos with LRU size cap
+
+    Derivatives are rendered lazily in the image process pool. Requests for
+    the same derivative that arrive while it is being rendered share one
+    render. Widths are snapped to IMAGE_WIDTHS to bound the number of
+    variants per photo.
+
+    Size accounting lives on disk, so the cap holds for all worker
+    processes together: after each render the directory is scanned under a
+    lock file and least recently used files are removed. Recency is the
+    file atime, set explicitly on hits (mount options like relatime do not
+    matter). The cap can be exceeded while every file is in its grace period.
+    """
+
+    def __init__(self):
+        self.cache_dir = os.path.join(settings.UPLOAD_DIR, "cache")
+        self.lock_path = os.path.join(self.cache_dir, LOCK_FILE)
+        self.max_bytes = settings.IMAGE_CACHE_MAX_BYTES
+        self.widths = sorted(settings.IMAGE_WIDTHS)
+        self._pending: Dict[str, asyncio.Future] = {}
+
+        self.supported_formats = [
+            name for name in ("avif", "webp")
+            if features.check(name)
+        ] + ["jpeg"]
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock shared by all processes using the cache directory"""
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield  # closing the file releases the lock
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        """(atime, path, size) of cached files, least recently used first"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith(".") or entry.name.endswith(".part"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, entry.path, stat.st_size))
+        entries.sort()
+        return entries
+
+    def evict(self) -> int:
+        """Remove least recently used files until the cache fits max_bytes, returns bytes freed"""
+        with self._locked():
+            entries = self._scan()
+            excess = sum(size for _, _, size in entries) - self.max_bytes
+            cutoff = time.time() - EVICT_GRACE_SECONDS
+            freed = 0
+
+            for _, path, size in entries:
+                if freed >= excess:
+                    break
+                try:
+                    # Re-check: a hit in another process may have touched it since the scan
+                    if os.stat(path).st_atime > cutoff:
+                        continue
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                freed += size
+
+            return freed
+
+    def snap_width(self, width: int) -> int:
+        """Smallest configured width that is >= requested width"""
+        for candidate in self.widths:
+            if candidate >= width:
+                return candidate
+        return self.widths[-1]
+
+    def negotiate_format(self, accept: Optional[str], requested: Optional[str] = None) -> str:
+        """Pick output format from explicit request or Accept header"""
+        if requested:
+            requested = requested.lower().replace("jpg", "jpeg")
+            if requested in self.supported_formats:
+                return requested
+
+        accept = (accept or "").lower()
+        for name in self.supported_formats:
+            if name != "jpeg" and f"image/{name}" in accept:
+                return name
+        return "jpeg"
+
+    def _touch(self, path: str) -> bool:
+        """Mark file as recently used, False if it is not cached"""
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_atime > TOUCH_INTERVAL_SECONDS:
+                # mtime is kept: it is part of the ETag
+                os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def _render(self, source_path: str, path: str, width: int, pil_format: str) -> Optional[int]:
+        """Render derivative, then trim the cache back to its size cap"""
+        size = await file_service.render_derivative_async(
+            source_path, path, width, pil_format, settings.IMAGE_DERIVATIVE_QUALITY
+        )
+        if size is not None:
+            try:
+                await asyncio.to_thread(self.evict)
+            except OSError as e:
+                print(f"Error evicting image cache: {e}")
+        return size
+
+    async def get(self, filename: str, width: int, image_format: str) -> Optional[Tuple[str, str]]:
+        """Return (path, media type) of derivative, rendering it if needed"""
+        source_path = os.path.join(file_service.photos_dir, filename)
+        if os.path.basename(filename) != filename or not os.path.isfile(source_path):
+            return None
+
+        pil_format, ext, media_type = IMAGE_FORMATS[image_format]
+        name = os.path.splitext(filename)[0]
+        path = os.path.join(self.cache_dir, f"{name}_w{width}.{ext}")
+
+        if self._touch(path):
+            return path, media_type
+
+        pending = self._pending.get(path)
+        if pending is None:
+            pending = asyncio.ensure_future(self._render(source_path, path, width, pil_format))
+            self._pending[path] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(path, None))
+
+        size = await asyncio.shield(pending)
+        if size is None:
+            return None
+        return path, media_type
+
+    def get_stats(self) -> dict:
+        entries = self._scan()
+        return {
+            "entries": len(entries),
+            "total_bytes": sum(size for _, _, size in entries),
+            "max_bytes": self.max_bytes,
+            "rendering": len(self._pending),
+        }
+
+
+# Singleton instance
+image_cache = ImageDerivativeCache()
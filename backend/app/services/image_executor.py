@@ -0,0 +1,99 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Optional
+
+from app.core.config import settings
+from app.core.metrics import IMAGE_PROCESSING_DURATION
+
+
+# Worker-side entry points (module level so they can be pickled)
+def _optimize_image(filepath: str, max_width: int, max_height: int, quality: int) -> bool:
+    from app.services.file_service import file_service
+    return file_service.optimize_image(filepath, max_width, max_height, quality)
+
+
+def _create_thumbnail(filepath: str, thumbnail_size: tuple) -> Optional[str]:
+    from app.services.file_service import file_service
+    return file_service.create_thumbnail(filepath, thumbnail_size)
+
+
+def _get_file_info(filepath: str) -> dict:
+    from app.services.file_service import file_service
+    return file_service.get_file_info(filepath)
+
+
+def _render_derivative(filepath: str, target_path: str, width: int, image_format: str, quality: int) -> Optional[int]:
+    from app.services.file_service import file_service
+    return file_service.render_derivative(filepath, target_path, width, image_format, quality)
+
+
+class ImageExecutor:
+    """
+    Process pool for CPU-heavy Pillow work
+
+    Submissions are bounded by IMAGE_WORKERS + IMAGE_QUEUE_SIZE slots; when
+    all slots are taken callers wait instead of piling work into the pool.
+    Until start() is called (e.g. in scripts) work runs in a thread.
+    """
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.workers = 0
+        self.queue_size = 0
+        self.in_flight = 0
+
+    def start(self, workers: int = None, queue_size: int = None):
+        """Create the process pool (called from app lifespan)"""
+        if self._pool is not None:
+            return
+        self.workers = workers or settings.IMAGE_WORKERS
+        self.queue_size = queue_size if queue_size is not None else settings.IMAGE_QUEUE_SIZE
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(settings.IMAGE_MP_START_METHOD)
+        )
+        self._slots = asyncio.Semaphore(self.workers + self.queue_size)
+
+    async def shutdown(self):
+        """Finish running tasks, cancel queued ones and stop worker processes"""
+        if self._pool is None:
+            return
+        pool = self._pool
+        self._pool = None
+        self._slots = None
+        await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+
+    async def run(self, func: Callable, *args):
+        """Run picklable function in the pool and await its result"""
+        operation = func.__name__.lstrip("_")
+        if self._pool is None:
+            started = time.perf_counter()
+            try:
+                return await asyncio.to_thread(func, *args)
+            finally:
+                IMAGE_PROCESSING_DURATION.observe(time.perf_counter() - started, operation)
+
+        async with self._slots:
+            self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._pool, partial(func, *args))
+            finally:
+                self.in_flight -= 1
+                IMAGE_PROCESSING_DURATION.observe(time.perf_counter() - started, operation)
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+        }
+
+
+# Singleton instance
+image_executor = ImageExecutor()
@@ -0,0 +1,209 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.models import NotificationOutbox
+from app.services.telegram_service import (
+    MEDIA_GROUP_MAX, notify_new_order, notify_order_photos, notify_status_change
+)
+
+
+def _utcnow() -> datetime:
+    """UTC timestamp (SQLite stores it without offset, same clock as CURRENT_TIMESTAMP)"""
+    return datetime.now(timezone.utc)
+
+
+class NotificationOutboxService:
+    """
+    Transactional outbox for notifications
+
+    Routes add an outbox row in the same transaction as the order change,
+    background workers deliver it with retries and exponential backoff.
+    Rows are claimed with a lease (next_attempt_at is pushed forward), so a
+    worker that dies mid-delivery only delays the notification until the
+    lease expires - pending rows survive restarts.
+    
+    A handler may return "followups" (kind, payload) with its success; they
+    are queued in the same commit that marks the message sent.
+    """
+
+    def __init__(self):
+        self.handlers: Dict[str, Callable[..., Awaitable[dict]]] = {
+            "new_order": self._notify_new_order,
+            "order_photos": self._notify_order_photos,
+            "status_change": notify_status_change,
+        }
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def enqueue(self, db: AsyncSession, kind: str, **payload) -> NotificationOutbox:
+        """Add notification to the session (committed together with caller's changes)"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown notification kind: {kind}")
+
+        message = NotificationOutbox(
+            kind=kind,
+            payload=payload,
+            status="pending",
+            attempts=0,
+            next_attempt_at=_utcnow()
+        )
+        db.add(message)
+        return message
+
+    async def _notify_new_order(self, photo_paths: List[str] = None, **payload) -> dict:
+        """Send the order text; photos follow as album messages"""
+        result = await notify_new_order(photo_paths=photo_paths, send_photos=False, **payload)
+        if result.get("success") and photo_paths:
+            result["followups"] = [("order_photos", {
+                "order_id": payload["order_id"],
+                "photo_paths": photo_paths,
+                "start": 0,
+                "total": len(photo_paths)
+            })]
+        return result
+
+    async def _notify_order_photos(
+        self,
+        order_id: int,
+        photo_paths: List[str],
+        start: int = 0,
+        total: Optional[int] = None
+    ) -> dict:
+        """
+        Send the first album of photo_paths
+
+        The rest is queued only after this album is delivered, so albums of
+        one order arrive in order even with several workers.
+        """
+        album, rest = photo_paths[:MEDIA_GROUP_MAX], photo_paths[MEDIA_GROUP_MAX:]
+        result = await notify_order_photos(order_id=order_id, photo_paths=album, start=start, total=total)
+        if result.get("success") and rest:
+            result["followups"] = [("order_photos", {
+                "order_id": order_id,
+                "photo_paths": rest,
+                "start": start + len(album),
+                "total": total
+            })]
+        return result
+
+    def wake(self):
+        """Wake idle workers after a commit instead of waiting for the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def backoff_delay(self, attempts: int) -> float:
+        """Exponential backoff with full jitter"""
+        delay = min(settings.OUTBOX_BACKOFF_MAX, settings.OUTBOX_BACKOFF_BASE ** attempts)
+        return random.uniform(delay / 2, delay)
+
+    async def start(self, workers: int = 1):
+        """Start background delivery workers (called from app lifespan)"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        for idx in range(max(1, workers)):
+            self._tasks.append(asyncio.create_task(self._worker(idx)))
+
+    async def stop(self):
+        """Stop workers; interrupted deliveries are retried after the lease expires"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+    async def _claim(self, db: AsyncSession) -> Optional[NotificationOutbox]:
+        """Claim one due message by moving its next_attempt_at past the lease"""
+        now = _utcnow()
+        stmt = select(NotificationOutbox.id, NotificationOutbox.next_attempt_at).where(
+            NotificationOutbox.status == "pending",
+            NotificationOutbox.next_attempt_at <= now
+        ).order_by(NotificationOutbox.next_attempt_at).limit(settings.OUTBOX_BATCH_SIZE)
+        candidates = (await db.execute(stmt)).all()
+
+        for message_id, due_at in candidates:
+            claim = update(NotificationOutbox).where(
+                NotificationOutbox.id == message_id,
+                NotificationOutbox.status == "pending",
+                NotificationOutbox.next_attempt_at == due_at
+            ).values(
+                next_attempt_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS),
+                attempts=NotificationOutbox.attempts + 1
+            )
+            result = await db.execute(claim)
+            message = await db.get(NotificationOutbox, message_id) if result.rowcount == 1 else None
+            # Load before commit so the write connection is not held during delivery
+            await db.commit()
+
+            if message is not None:
+                return message
+
+        return None
+
+    async def _deliver(self, db: AsyncSession, message: NotificationOutbox):
+        """Send one claimed message and record the outcome"""
+        result = {}
+        try:
+            result = await self.handlers[message.kind](**(message.payload or {}))
+            error = None if result.get("success") else str(result.get("error", "Unknown error"))
+        except Exception as e:
+            error = str(e)
+
+        if error is None:
+            message.status = "sent"
+            message.sent_at = _utcnow()
+            message.last_error = None
+            for kind, payload in result.get("followups", ()):
+                self.enqueue(db, kind, **payload)
+        elif message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            message.status = "failed"
+            message.last_error = error[:1000]
+            print(f"Notification #{message.id} failed permanently: {error}")
+        else:
+            message.next_attempt_at = _utcnow() + timedelta(seconds=self.backoff_delay(message.attempts))
+            message.last_error = error[:1000]
+            print(f"Notification #{message.id} attempt {message.attempts} failed: {error}")
+
+        await db.commit()
+
+    async def _worker(self, idx: int):
+        """Drain due messages, then sleep until woken up or the poll interval passes"""
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    while True:
+                        message = await self._claim(db)
+                        if message is None:
+                            break
+                        await self._deliver(db, message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Outbox worker {idx} error: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.OUTBOX_POLL_INTERVAL)
+                self._wakeup.clear()
+            except asyncio.TimeoutError:
+                pass
+
+
+# Singleton instance
+outbox_service = NotificationOutboxService()
+
+
+# Wrapper functions for imports
+def enqueue_notification(db: AsyncSession, kind: str, **payload) -> NotificationOutbox:
+    """Wrapper for adding a notification to the outbox"""
+    return outbox_service.enqueue(db, kind, **payload)
+
+
+def wake_outbox_workers():
+    """Wrapper for waking outbox workers after commit"""
+    outbox_service.wake()
@@ -0,0 +1,196 @@
+import re
+import unicodedata
+from typing import List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.dialect import dialect_name
+from app.services.read_queries import ORDER_COLUMNS, rows_as_dicts
+
+
+# Letters unicode61 keeps as they are; folded on both sides (index and query)
+# so "lodz" finds "Łódź" and "іжак" finds "їжак"
+FOLD_MAP = {
+    "ł": "l", "Ł": "L",
+    "ї": "і", "Ї": "І",
+    "й": "и", "Й": "И",
+    "ґ": "г", "Ґ": "Г",
+    "ё": "е", "Ё": "Е",
+}
+
+# PostgreSQL has no remove_diacritics: Polish letters and all Cyrillic upper
+# case are mapped by translate() in the index expression, because lower()
+# only handles ASCII under the C locale (the postgres image default)
+PG_FOLD_CHARS = (
+    "ąćęłńóśźżĄĆĘŁŃÓŚŹŻ"
+    + "".join(chr(code) for code in range(ord("А"), ord("Я") + 1))
+    + "ЄІЇҐЁїйґё"
+)
+
+# Address ranks above description
+BM25_WEIGHTS = (2.0, 1.0)
+MAX_TERMS = 10
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _fold_sql(expr: str) -> str:
+    for source, target in FOLD_MAP.items():
+        expr = f"replace({expr}, '{source}', '{target}')"
+    return expr
+
+
+def _fts_values(prefix: str) -> str:
+    return f"{_fold_sql(f'{prefix}.address')}, {_fold_sql(f'{prefix}.description')}"
+
+
+# Contentless table: text lives in orders, the index only holds folded tokens
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS orders_fts USING fts5(
+        address, description,
+        content='',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS orders_fts_ai AFTER INSERT ON orders BEGIN
+        INSERT INTO orders_fts(rowid, address, description)
+        VALUES (new.id, {_fts_values('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS orders_fts_ad AFTER DELETE ON orders BEGIN
+        INSERT INTO orders_fts(orders_fts, rowid, address, description)
+        VALUES ('delete', old.id, {_fts_values('old')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS orders_fts_au AFTER UPDATE OF address, description ON orders BEGIN
+        INSERT INTO orders_fts(orders_fts, rowid, address, description)
+        VALUES ('delete', old.id, {_fts_values('old')});
+        INSERT INTO orders_fts(rowid, address, description)
+        VALUES (new.id, {_fts_values('new')});
+    END
+    """,
+]
+
+
+def fold(value: str) -> str:
+    """Lowercase and strip diacritics the same way the index does"""
+    value = "".join(FOLD_MAP.get(char, char) for char in value)
+    decomposed = unicodedata.normalize("NFKD", value.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _pg_document() -> str:
+    source = PG_FOLD_CHARS
+    target = "".join(fold(char) for char in source)
+
+    def weighted(column: str, weight: str) -> str:
+        folded = f"lower(translate(coalesce({column}, ''), '{source}', '{target}'))"
+        return f"setweight(to_tsvector('simple', {folded}), '{weight}')"
+
+    return f"{weighted('address', 'A')} || {weighted('description', 'B')}"
+
+
+# Same expression in index and queries, so the planner uses the GIN index
+PG_DOCUMENT = _pg_document()
+PG_SEARCH_DDL = f"CREATE INDEX IF NOT EXISTS ix_orders_search ON orders USING gin (({PG_DOCUMENT}))"
+
+
+def ensure_search_index(conn: Connection):
+    """
+    Create the full-text index
+    
+    SQLite: FTS5 table with sync triggers, backfilled once.
+    PostgreSQL: GIN index over a tsvector expression (always in sync).
+    """
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(PG_SEARCH_DDL)
+        return
+    if conn.dialect.name != "sqlite":
+        return
+
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'orders_fts'"
+    ).scalar()
+    for ddl in FTS_DDL:
+        conn.exec_driver_sql(ddl)
+
+    if not exists:
+        conn.exec_driver_sql(
+            f"INSERT INTO orders_fts(rowid, address, description) "
+            f"SELECT id, {_fts_values('orders')} FROM orders"
+        )
+
+
+def query_terms(query: str) -> List[str]:
+    """Folded words of user input; FTS syntax in the input is not interpreted"""
+    return _TERM_RE.findall(fold(query))[:MAX_TERMS]
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Turn user input into an FTS5 MATCH expression
+
+    Every word becomes a quoted prefix term ("kran" also finds "kranu",
+    "kranie"), all terms must match. Returns None when there is nothing to
+    search for.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def build_tsquery(query: str) -> Optional[str]:
+    """PostgreSQL counterpart of build_match_query (to_tsquery syntax)"""
+    terms = query_terms(query)
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+async def search_orders(
+    db: AsyncSession,
+    query: str,
+    status: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> Tuple[List[dict], int]:
+    """Return (orders ranked by relevance, total number of matches)"""
+    if dialect_name(db) == "postgresql":
+        match = build_tsquery(query)
+        source = "orders"
+        where = f"({PG_DOCUMENT}) @@ to_tsquery('simple', :match)"
+        ranking = f"ts_rank({PG_DOCUMENT}, to_tsquery('simple', :match)) DESC"
+    else:
+        match = build_match_query(query)
+        source = "orders_fts JOIN orders ON orders.id = orders_fts.rowid"
+        where = "orders_fts MATCH :match"
+        ranking = f"bm25(orders_fts, {BM25_WEIGHTS[0]}, {BM25_WEIGHTS[1]})"
+
+    if match is None:
+        return [], 0
+
+    params = {"match": match}
+    if status:
+        where += " AND orders.status = :status"
+        params["status"] = status
+
+    columns = ", ".join(f"orders.{column.key}" for column in ORDER_COLUMNS)
+    stmt = text(f"""
+        SELECT {columns} FROM {source}
+        WHERE {where}
+        ORDER BY {ranking}, orders.id DESC
+        LIMIT :limit OFFSET :offset
+    """).columns(*ORDER_COLUMNS)
+    result = await db.execute(stmt, {**params, "limit": limit, "offset": offset})
+    orders = rows_as_dicts(result)
+
+    total = await db.execute(text(f"SELECT count(*) FROM {source} WHERE {where}"), params)
+
+    return orders, total.scalar()
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """
+    Reservation-based token bucket
+
+    Tokens may go negative: every caller reserves its tokens immediately and
+    sleeps for the deficit, which queues callers in FIFO order without locks.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """Reserve tokens and return how long the caller has to wait (seconds)"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= cost
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def block(self, seconds: float):
+        """Stop handing out tokens for given time (e.g. Telegram retry_after)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def blocked_for(self) -> float:
+        return max(0.0, self.blocked_until - time.monotonic())
+
+
+class TelegramRateLimiter:
+    """
+    Per-chat and global limits for Telegram Bot API
+
+    Telegram allows ~30 messages/s overall, ~1 message/s per private chat
+    and 20 messages/min per group (chat ids of groups are negative).
+    """
+
+    def __init__(
+        self,
+        global_rate: float,
+        global_burst: int,
+        chat_rate: float,
+        chat_burst: int,
+        group_rate_per_minute: int
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate_per_minute / 60.0
+        self.chat_buckets: Dict[str, TokenBucket] = {}
+
+        # Monitoring counters
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.total_acquired = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.rate_limited_count = 0
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            is_group = str(chat_id).startswith("-")
+            bucket = TokenBucket(self.group_rate if is_group else self.chat_rate, self.chat_burst)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def acquire(self, chat_id: str, cost: float = 1.0) -> float:
+        """Wait until a request to chat_id is allowed, return time waited"""
+        chat_bucket = self._chat_bucket(chat_id)
+        started = time.monotonic()
+
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            wait = max(chat_bucket.reserve(cost), self.global_bucket.reserve(cost))
+            while wait > 0:
+                await asyncio.sleep(wait)
+                # retry_after may have been received while we were sleeping
+                wait = max(chat_bucket.blocked_for(), self.global_bucket.blocked_for())
+        finally:
+            self.queue_depth -= 1
+
+        waited = time.monotonic() - started
+        self.total_acquired += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return waited
+
+    def retry_after(self, chat_id: str, seconds: float):
+        """
+        Honour 429 retry_after for the chat and globally
+
+        Telegram does not say which limit was hit, so all requests pause.
+        """
+        self.rate_limited_count += 1
+        self._chat_bucket(chat_id).block(seconds)
+        self.global_bucket.block(seconds)
+
+    def get_stats(self) -> dict:
+        """Queue depth and wait time for monitoring"""
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "total_acquired": self.total_acquired,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+            "avg_wait_seconds": round(self.total_wait_seconds / self.total_acquired, 3) if self.total_acquired else 0.0,
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+            "rate_limited_count": self.rate_limited_count,
+        }
@@ -0,0 +1,98 @@
+"""
+Read layer for list and detail endpoints
+
+Selects only the columns the responses need and returns plain dicts
+instead of ORM objects (no identity map, no attribute instrumentation).
+Statements are lambda statements: SQLAlchemy caches the statement and
+its compiled SQL per code location and only binds new values per call.
+Write paths keep using ORM objects.
+"""
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import select, func, tuple_, literal, lambda_stmt
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Order, AvailableDate
+
+
+# Columns of OrderResponse / AvailableDateResponse
+ORDER_COLUMNS = (
+    Order.id, Order.phone, Order.address, Order.description, Order.selected_date,
+    Order.photos, Order.status, Order.created_at, Order.updated_at
+)
+DATE_COLUMNS = (AvailableDate.id, AvailableDate.date, AvailableDate.is_available)
+
+
+def rows_as_dicts(result) -> List[dict]:
+    """Result rows as dicts keyed by column name"""
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def _filter_orders(
+    stmt,
+    status: Optional[str] = None,
+    phone: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None
+):
+    if status:
+        stmt += lambda s: s.where(Order.status == status)
+    if phone:
+        stmt += lambda s: s.where(Order.phone == phone)
+    if date_from:
+        stmt += lambda s: s.where(Order.selected_date >= date_from)
+    if date_to:
+        stmt += lambda s: s.where(Order.selected_date <= date_to)
+    return stmt
+
+
+async def list_orders(
+    db: AsyncSession,
+    status: Optional[str] = None,
+    phone: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None
+) -> List[dict]:
+    """Orders newest first; `after` is the (created_at, id) keyset cursor"""
+    stmt = _filter_orders(lambda_stmt(lambda: select(*ORDER_COLUMNS)), status, phone, date_from, date_to)
+
+    if after:
+        # Bind with the column type so SQLite compares timestamps in stored format
+        cursor_created_at = literal(after[0], Order.created_at.type)
+        cursor_id = after[1]
+        stmt += lambda s: s.where(
+            tuple_(Order.created_at, Order.id) < tuple_(cursor_created_at, cursor_id)
+        )
+
+    stmt += lambda s: s.order_by(Order.created_at.desc(), Order.id.desc())
+    if limit:
+        stmt += lambda s: s.limit(limit)
+
+    return rows_as_dicts(await db.execute(stmt))
+
+
+async def count_orders(
+    db: AsyncSession,
+    status: Optional[str] = None,
+    phone: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None
+) -> int:
+    stmt = lambda_stmt(lambda: select(func.count()).select_from(Order))
+    stmt = _filter_orders(stmt, status, phone, date_from, date_to)
+    return (await db.execute(stmt)).scalar()
+
+
+async def get_order(db: AsyncSession, order_id: int) -> Optional[dict]:
+    stmt = lambda_stmt(lambda: select(*ORDER_COLUMNS).where(Order.id == order_id))
+    rows = rows_as_dicts(await db.execute(stmt))
+    return rows[0] if rows else None
+
+
+async def list_dates(db: AsyncSession) -> List[dict]:
+    """All calendar dates, oldest first (admin view)"""
+    stmt = lambda_stmt(lambda: select(*DATE_COLUMNS).order_by(AvailableDate.date))
+    return rows_as_dicts(await db.execute(stmt))
@@ -1,6 +1,82 @@
 import httpx
-from typing import List, Optional
+import json
+import mimetypes
+import os
+import time
+import uuid
+from typing import AsyncIterator, List, Optional, Tuple
+import aiofiles
+import aiofiles.os
 from app.core.config import settings
+from app.core.metrics import TELEGRAM_REQUESTS, TELEGRAM_REQUEST_DURATION
+from app.services.rate_limiter import TelegramRateLimiter
+
+
+# Telegram accepts 2-10 items per sendMediaGroup request
+MEDIA_GROUP_MAX = 10
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class MultipartFileStream:
+    """
+    multipart/form-data body that streams files from disk with aiofiles
+
+    Content-Length is computed up front from file sizes, so the request is
+    not chunk-encoded and no file is ever fully loaded into memory.
+    """
+    
+    def __init__(self, fields: dict, files: List[Tuple[str, str]]):
+        self.boundary = uuid.uuid4().hex
+        self.fields = fields
+        self.files = files  # (field name, path)
+    
+    def _field_part(self, name: str, value: str) -> bytes:
+        return (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n"
+        ).encode()
+    
+    def _file_header(self, name: str, path: str) -> bytes:
+        filename = os.path.basename(path)
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        return (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+    
+    def _closing(self) -> bytes:
+        return f"--{self.boundary}--\r\n".encode()
+    
+    async def headers(self) -> dict:
+        """Request headers including exact Content-Length"""
+        length = sum(len(self._field_part(k, v)) for k, v in self.fields.items())
+        for name, path in self.files:
+            stat = await aiofiles.os.stat(path)
+            length += len(self._file_header(name, path)) + stat.st_size + 2
+        length += len(self._closing())
+        
+        return {
+            "Content-Type": f"multipart/form-data; boundary={self.boundary}",
+            "Content-Length": str(length)
+        }
+    
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for name, value in self.fields.items():
+            yield self._field_part(name, value)
+        
+        for name, path in self.files:
+            yield self._file_header(name, path)
+            async with aiofiles.open(path, 'rb') as f:
+                while True:
+                    chunk = await f.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+            yield b"\r\n"
+        
+        yield self._closing()
 
 
 class TelegramService:
@@ -8,60 +84,194 @@ class TelegramService:
         self.bot_token = settings.TELEGRAM_BOT_TOKEN
         self.chat_id = settings.TELEGRAM_CHAT_ID
         self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self._client: Optional[httpx.AsyncClient] = None
+        self.rate_limiter = TelegramRateLimiter(
+            global_rate=settings.TELEGRAM_GLOBAL_RATE,
+            global_burst=settings.TELEGRAM_GLOBAL_BURST,
+            chat_rate=settings.TELEGRAM_CHAT_RATE,
+            chat_burst=settings.TELEGRAM_CHAT_BURST,
+            group_rate_per_minute=settings.TELEGRAM_GROUP_RATE_PER_MINUTE
+        )
+    
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create pooled HTTP client with keep-alive and HTTP/2"""
+        return httpx.AsyncClient(
+            http2=settings.TELEGRAM_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.TELEGRAM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.TELEGRAM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.TELEGRAM_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.TELEGRAM_CONNECT_TIMEOUT,
+                read=settings.TELEGRAM_READ_TIMEOUT,
+                write=settings.TELEGRAM_WRITE_TIMEOUT,
+                pool=settings.TELEGRAM_POOL_TIMEOUT
+            )
+        )
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared HTTP client (created lazily outside of app lifespan, e.g. in scripts)"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+    
+    async def start(self):
+        """Open shared HTTP client (called from app lifespan)"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+    
+    async def close(self):
+        """Close shared HTTP client and its pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    def get_stats(self) -> dict:
+        """Rate limiter queue depth and wait time (for monitoring)"""
+        return self.rate_limiter.get_stats()
+    
+    def _retry_after(self, response: httpx.Response) -> float:
+        """Read retry_after from 429 response (falls back to 1 second)"""
+        try:
+            return float(response.json().get("parameters", {}).get("retry_after", 1))
+        except Exception:
+            return float(response.headers.get("Retry-After", 1))
+    
+    @staticmethod
+    def _outcome(status_code: int) -> str:
+        if status_code == 200:
+            return "ok"
+        if status_code == 429:
+            return "rate_limited"
+        return "error"
+    
+    @staticmethod
+    def _record_call(method: str, outcome: str, started: float):
+        """Count and time one Bot API call (rate limiter wait excluded)"""
+        TELEGRAM_REQUESTS.inc(method, outcome)
+        TELEGRAM_REQUEST_DURATION.observe(time.perf_counter() - started, method, outcome)
+    
+    async def _request(
+        self,
+        method: str,
+        json: Optional[dict] = None,
+        fields: Optional[dict] = None,
+        files: Optional[List[Tuple[str, str]]] = None,
+        cost: int = 1
+    ) -> httpx.Response:
+        """
+        POST to Bot API, waiting for rate limiter and retrying on 429
+        
+        cost is the number of messages the call posts (albums count each photo).
+        """
+        for attempt in range(settings.TELEGRAM_MAX_RETRIES + 1):
+            await self.rate_limiter.acquire(self.chat_id, cost)
+            
+            started = time.perf_counter()
+            try:
+                if files is not None:
+                    response = await self._post_multipart(method, fields or {}, files)
+                else:
+                    response = await self.client.post(f"{self.base_url}/{method}", json=json)
+            except httpx.HTTPError:
+                self._record_call(method, "network_error", started)
+                raise
+            self._record_call(method, self._outcome(response.status_code), started)
+            
+            if response.status_code != 429 or attempt == settings.TELEGRAM_MAX_RETRIES:
+                return response
+            
+            retry_after = self._retry_after(response)
+            print(f"Telegram rate limit hit ({method}), retrying after {retry_after}s")
+            self.rate_limiter.retry_after(self.chat_id, retry_after)
+        
+        return response
     
     async def send_message(self, text: str, parse_mode: str = "HTML") -> dict:
         """Send text message to Telegram"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/sendMessage",
-                    json={
-                        "chat_id": self.chat_id,
-                        "text": text,
-                        "parse_mode": parse_mode
-                    },
-                    timeout=30.0
-                )
+            response = await self._request(
+                "sendMessage",
+                json={
+                    "chat_id": self.chat_id,
+                    "text": text,
+                    "parse_mode": parse_mode
+                }
+            )
+            
+            if response.status_code == 200:
+                return {"success": True, "data": response.json()}
+            else:
+                print(f"Telegram API error: {response.text}")
+                return {"success": False, "error": response.text}
                 
-                if response.status_code == 200:
-                    return {"success": True, "data": response.json()}
-                else:
-                    print(f"Telegram API error: {response.text}")
-                    return {"success": False, "error": response.text}
-                    
         except Exception as e:
             print(f"Error sending Telegram message: {e}")
             return {"success": False, "error": str(e)}
     
+    async def _post_multipart(self, method: str, fields: dict, files: List[Tuple[str, str]]) -> httpx.Response:
+        """POST multipart request with file bodies streamed from disk"""
+        body = MultipartFileStream(fields, files)
+        headers = await body.headers()
+        return await self.client.post(
+            f"{self.base_url}/{method}",
+            content=body,
+            headers=headers
+        )
+    
     async def send_photo(self, photo_path: str, caption: Optional[str] = None) -> dict:
         """Send photo to Telegram"""
         try:
-            async with httpx.AsyncClient() as client:
-                with open(photo_path, 'rb') as photo:
-                    files = {'photo': photo}
-                    data = {'chat_id': self.chat_id}
-                    
-                    if caption:
-                        data['caption'] = caption
-                        data['parse_mode'] = 'HTML'
-                    
-                    response = await client.post(
-                        f"{self.base_url}/sendPhoto",
-                        files=files,
-                        data=data,
-                        timeout=30.0
-                    )
-                    
-                    if response.status_code == 200:
-                        return {"success": True, "data": response.json()}
-                    else:
-                        print(f"Telegram API error: {response.text}")
-                        return {"success": False, "error": response.text}
-                        
+            data = {'chat_id': self.chat_id}
+            
+            if caption:
+                data['caption'] = caption
+                data['parse_mode'] = 'HTML'
+            
+            response = await self._request("sendPhoto", fields=data, files=[('photo', photo_path)])
+            
+            if response.status_code == 200:
+                return {"success": True, "data": response.json()}
+            else:
+                print(f"Telegram API error: {response.text}")
+                return {"success": False, "error": response.text}
+                
         except Exception as e:
             print(f"Error sending Telegram photo: {e}")
             return {"success": False, "error": str(e)}
     
+    async def send_media_group(self, photo_paths: List[str], caption: Optional[str] = None) -> dict:
+        """Send 2-10 photos as one album, caption is attached to the first item"""
+        try:
+            media = []
+            files = []
+            for idx, photo_path in enumerate(photo_paths):
+                item = {"type": "photo", "media": f"attach://photo{idx}"}
+                if idx == 0 and caption:
+                    item["caption"] = caption
+                    item["parse_mode"] = "HTML"
+                media.append(item)
+                files.append((f"photo{idx}", photo_path))
+            
+            data = {
+                'chat_id': self.chat_id,
+                'media': json.dumps(media)
+            }
+            
+            response = await self._request("sendMediaGroup", fields=data, files=files, cost=len(media))
+            
+            if response.status_code == 200:
+                return {"success": True, "data": response.json()}
+            else:
+                print(f"Telegram API error: {response.text}")
+                return {"success": False, "error": response.text}
+                
+        except Exception as e:
+            print(f"Error sending Telegram media group: {e}")
+            return {"success": False, "error": str(e)}
+    
     def format_order_message(
         self,
         order_id: int,
@@ -111,12 +321,18 @@ class TelegramService:
         address: str,
         description: str,
         selected_date: str,
-        photo_paths: List[str] = None
+        photo_paths: List[str] = None,
+        send_photos: bool = True
     ) -> dict:
-        """Send notification about new order"""
+        """
+        Send notification about new order
+        
+        Photos follow as albums of up to MEDIA_GROUP_MAX; a failed album fails
+        the whole call. With send_photos=False only the text is sent and the
+        caller delivers albums itself (the outbox queues each one separately,
+        so a retry does not repeat the text).
+        """
         try:
-            import os
-            
             # Send text message
             photo_count = len(photo_paths) if photo_paths else 0
             message = self.format_order_message(
@@ -133,20 +349,16 @@ class TelegramService:
             if not result["success"]:
                 return result
             
-            # Send photos if available
-            if photo_paths:
-                for idx, photo_filename in enumerate(photo_paths, 1):
-                    # Побудовуємо повний шлях до файлу
-                    photo_path = os.path.join("uploads", "photos", photo_filename)
-                    
-                    if os.path.exists(photo_path):
-                        caption = f"Zdjęcie {idx}/{photo_count} - Zamówienie #{order_id}"
-                        photo_result = await self.send_photo(photo_path, caption)
-                        
-                        if not photo_result["success"]:
-                            print(f"Failed to send photo {idx}: {photo_result.get('error')}")
-                    else:
-                        print(f"Photo file not found: {photo_path}")
+            if send_photos and photo_paths:
+                for start in range(0, len(photo_paths), MEDIA_GROUP_MAX):
+                    photo_result = await self.notify_order_photos(
+                        order_id=order_id,
+                        photo_paths=photo_paths[start:start + MEDIA_GROUP_MAX],
+                        start=start,
+                        total=len(photo_paths)
+                    )
+                    if not photo_result["success"]:
+                        return photo_result
             
             return {
                 "success": True,
@@ -160,6 +372,50 @@ class TelegramService:
                 "error": str(e)
             }
     
+    async def notify_order_photos(
+        self,
+        order_id: int,
+        photo_paths: List[str],
+        start: int = 0,
+        total: Optional[int] = None
+    ) -> dict:
+        """Send one album of order photos (start/total number the captions)"""
+        try:
+            total = total or len(photo_paths)
+            existing_paths = []
+            for photo_filename in photo_paths[:MEDIA_GROUP_MAX]:
+                # Побудовуємо повний шлях до файлу
+                photo_path = os.path.join(settings.UPLOAD_DIR, "photos", photo_filename)
+                
+                if await aiofiles.os.path.exists(photo_path):
+                    existing_paths.append(photo_path)
+                else:
+                    print(f"Photo file not found: {photo_path}")
+            
+            if not existing_paths:
+                return {
+                    "success": True,
+                    "message": "Brak zdjęć do wysłania"
+                }
+            
+            if len(existing_paths) == 1:
+                caption = f"Zdjęcie {start + 1}/{total} - Zamówienie #{order_id}"
+                result = await self.send_photo(existing_paths[0], caption)
+            else:
+                caption = f"Zdjęcia {start + 1}-{start + len(existing_paths)}/{total} - Zamówienie #{order_id}"
+                result = await self.send_media_group(existing_paths, caption)
+            
+            if not result["success"]:
+                print(f"Failed to send photos {start + 1}-{start + len(existing_paths)}: {result.get('error')}")
+            return result
+            
+        except Exception as e:
+            print(f"Error sending order photos: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
     async def notify_status_change(
         self,
         order_id: int,
@@ -206,7 +462,8 @@ async def notify_new_order(
     address: str,
     description: str,
     selected_date: str,
-    photo_paths: List[str] = None
+    photo_paths: List[str] = None,
+    send_photos: bool = True
 ) -> dict:
     """Wrapper for notifying about new order"""
     return await telegram_service.notify_new_order(
@@ -215,7 +472,23 @@ async def notify_new_order(
         address=address,
         description=description,
         selected_date=selected_date,
-        photo_paths=photo_paths
+        photo_paths=photo_paths,
+        send_photos=send_photos
+    )
+
+
+async def notify_order_photos(
+    order_id: int,
+    photo_paths: List[str],
+    start: int = 0,
+    total: Optional[int] = None
+) -> dict:
+    """Wrapper for sending one album of order photos"""
+    return await telegram_service.notify_order_photos(
+        order_id=order_id,
+        photo_paths=photo_paths,
+        start=start,
+        total=total
     )
 
 
@@ -1,13 +1,19 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import os
 import asyncio
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
 from app.core.database import Base, engine
-from app.api.routes import orders, dates, availability
+from app.core.metrics import metrics, MetricsMiddleware, CONTENT_TYPE, render_metrics
+from app.core.migrations import lock_schema, ensure_indexes
+from app.services.order_search import ensure_search_index
+from app.api.routes import orders, dates, availability, photos, uploads
+from app.services.telegram_service import telegram_service
+from app.services.notification_outbox import outbox_service
+from app.services.image_executor import image_executor
 
 
 # Initialize database on startup
@@ -16,13 +22,26 @@ async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Initializing database...")
     async with engine.begin() as conn:
+        await conn.run_sync(lock_schema)
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(ensure_indexes)
+        await conn.run_sync(ensure_search_index)
     print("✅ Database tables created/verified")
     
+    await telegram_service.start()
+    await outbox_service.start(settings.OUTBOX_WORKERS)
+    print(f"✅ Notification outbox started ({settings.OUTBOX_WORKERS} workers)")
+    image_executor.start(settings.IMAGE_WORKERS, settings.IMAGE_QUEUE_SIZE)
+    await metrics.start()
+    
     yield
     
     # Shutdown
     print("Shutting down...")
+    await outbox_service.stop()
+    await image_executor.shutdown()
+    await telegram_service.close()
+    await metrics.stop()
 
 
 # Create app with lifespan
@@ -31,6 +50,7 @@ app = FastAPI(
     description="API для сервісу замовлення послуг дизайнера",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Add CORS middleware
@@ -40,22 +60,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination metadata of list endpoints (frontend is served from another origin)
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
     max_age=3600,
 )
 
+# Request count and latency per route template (outermost, times the whole stack)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(orders.router, prefix="/api/orders", tags=["Orders"])
 app.include_router(dates.router, prefix="/api/dates", tags=["Dates"])
 app.include_router(availability.router, prefix="/api/availability", tags=["Availability"])
+app.include_router(photos.router, prefix="/api/photos", tags=["Photos"])
+# Only uploads/photos is public (no StaticFiles mount: cache/ and temp/ stay private)
+app.include_router(uploads.router, prefix="/uploads", tags=["Uploads"])
 
 # Create uploads directory if it doesn't exist
 os.makedirs("uploads/photos", exist_ok=True)
 os.makedirs("uploads/temp", exist_ok=True)
 
-# Mount static files
-if os.path.exists("uploads"):
-    app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-
 
 @app.get("/")
 async def root():
@@ -65,3 +89,15 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text format, summed over all workers"""
+    return Response(await render_metrics(), media_type=CONTENT_TYPE)
+
+
+@app.get("/health/telegram")
+async def telegram_health():
+    """Telegram rate limiter queue depth and wait times"""
+    return telegram_service.get_stats()
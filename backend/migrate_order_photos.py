@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+One-off migration: fill order_photos from the Order.photos JSON column
+
+Safe to re-run - orders that already have order_photos rows are skipped.
+Size, hash and image header are read from the files in UPLOAD_DIR/photos;
+photos whose file is missing are recorded with the filename only.
+
+Usage: python migrate_order_photos.py
+"""
+import asyncio
+import hashlib
+import os
+import re
+from sqlalchemy import select, insert, exists
+
+from app.core.database import Base, engine, AsyncSessionLocal
+from app.models.models import Order, OrderPhoto
+from app.services.file_service import file_service
+
+BATCH_SIZE = 500
+_CONTENT_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def describe_file(filename: str) -> dict:
+    """Metadata of a stored photo (blocking, run in a thread)"""
+    filepath = os.path.join(file_service.photos_dir, filename)
+    stem = os.path.splitext(filename)[0]
+    info = {
+        "filename": filename,
+        "size": None,
+        "sha256": stem if _CONTENT_HASH_RE.match(stem) else None,
+        "width": None,
+        "height": None,
+        "mime_type": None,
+    }
+    if not os.path.isfile(filepath):
+        return info
+
+    info["size"] = os.path.getsize(filepath)
+    with open(filepath, "rb") as f:
+        if info["sha256"] is None:
+            # Legacy uuid filename: hash the content
+            digest = hashlib.sha256()
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+            info["sha256"] = digest.hexdigest()
+        info.update(file_service.probe_image(f))
+    return info
+
+
+async def migrate():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    migrated_orders = 0
+    migrated_photos = 0
+    last_id = 0
+
+    async with AsyncSessionLocal() as db:
+        while True:
+            has_rows = exists().where(OrderPhoto.order_id == Order.id)
+            result = await db.execute(
+                select(Order.id, Order.photos)
+                .where(Order.id > last_id, ~has_rows)
+                .order_by(Order.id)
+                .limit(BATCH_SIZE)
+            )
+            batch = result.all()
+            if not batch:
+                break
+
+            rows = []
+            for order_id, photos in batch:
+                if not isinstance(photos, list) or not photos:
+                    continue
+                for position, filename in enumerate(photos):
+                    if not isinstance(filename, str):
+                        continue
+                    info = await asyncio.to_thread(describe_file, filename)
+                    rows.append({"order_id": order_id, "position": position, **info})
+                migrated_orders += 1
+
+            if rows:
+                await db.execute(insert(OrderPhoto), rows)
+            await db.commit()
+
+            migrated_photos += len(rows)
+            last_id = batch[-1][0]
+            print(f"... up to order #{last_id}: {migrated_photos} photos")
+
+    await engine.dispose()
+    print(f"✅ Migrated {migrated_photos} photos of {migrated_orders} orders")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Load test for the booking API
+
+Drives the ASGI app from main.py in-process through httpx.ASGITransport
+(default) or a uvicorn server started in a subprocess (--uvicorn) with a
+weighted mix of scenarios at fixed concurrency:
+
+    create  POST /api/orders with 0-5 multipart photos
+    list    GET /api/orders (first page, sometimes filtered by status)
+    dates   GET /api/availability/check-dates
+    patch   PATCH /api/orders/{id}/status
+
+Runs against a throw-away SQLite database and upload directory unless
+DATABASE_URL / UPLOAD_DIR are set. Reports p50/p95/p99 latency, req/s and
+peak RSS of the server process tree, and writes them as JSON so runs can
+be compared.
+
+Usage (from backend/):
+    python -m perf.loadtest --duration 30 --concurrency 32
+    python -m perf.loadtest --mix create=1,list=4,dates=4,patch=1 --output perf/results/base.json
+    python -m perf.loadtest --uvicorn --workers 2 --compare perf/results/base.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = BACKEND_DIR / "perf" / "results"
+
+SCENARIOS = ("create", "list", "dates", "patch")
+STATUSES = ("new", "in_progress", "completed", "cancelled")
+DESCRIPTIONS = (
+    "Cieknie kran w łazience, trzeba wymienić uszczelkę",
+    "Nie działa gniazdko w kuchni, iskrzy przy podłączaniu",
+    "Montaż półek i karnisza w salonie",
+    "Не працює розетка в коридорі, потрібна заміна",
+    "Malowanie ścian w pokoju dziecięcym, ok. 12 m2",
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds of unmeasured load first")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default="create=1,list=4,dates=4,patch=1",
+                        help="scenario weights, e.g. create=1,list=4,dates=4,patch=1")
+    parser.add_argument("--max-photos", type=int, default=5, help="photos per order: random 0..N")
+    parser.add_argument("--photo-size", default="1280x960", help="synthetic JPEG size WxH")
+    parser.add_argument("--seed-orders", type=int, default=500, help="orders created before the run")
+    parser.add_argument("--uvicorn", action="store_true", help="run a uvicorn server instead of in-process")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (--uvicorn only)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="result JSON path (default: perf/results/loadtest-<time>.json)")
+    parser.add_argument("--compare", help="previous result JSON to compare against")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    args.weights = {}
+    for item in args.mix.split(","):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+        args.weights[name] = float(weight or 1)
+    args.width, args.height = (int(v) for v in args.photo_size.lower().split("x"))
+    return args
+
+
+def prepare_environment():
+    """Throw-away database and uploads unless configured explicitly"""
+    workdir = Path(tempfile.mkdtemp(prefix="loadtest-"))
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{workdir / 'loadtest.db'}")
+    os.environ.setdefault("UPLOAD_DIR", str(workdir / "uploads"))
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "loadtest")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "0")
+    # Telegram calls go through a proxy on a closed local port and fail fast,
+    # nothing leaves the machine (server subprocess inherits the environment)
+    os.environ["HTTPS_PROXY"] = "http://127.0.0.1:9"
+    os.environ["NO_PROXY"] = "127.0.0.1,localhost"
+    return workdir
+
+
+# --- Synthetic uploads ---
+
+class PhotoFactory:
+    """Pre-rendered JPEGs; random trailing bytes make every upload unique (no dedup)"""
+
+    def __init__(self, width: int, height: int, variants: int = 8):
+        from PIL import Image, ImageDraw
+
+        self.images = []
+        rng = random.Random(0)
+        for _ in range(variants):
+            img = Image.new("RGB", (width, height), tuple(rng.randrange(256) for _ in range(3)))
+            draw = ImageDraw.Draw(img)
+            for _ in range(200):
+                x, y = rng.randrange(width), rng.randrange(height)
+                draw.rectangle([x, y, x + rng.randrange(20, 200), y + rng.randrange(20, 200)],
+                               fill=tuple(rng.randrange(256) for _ in range(3)))
+            buffer = io.BytesIO()
+            img.save(buffer, "JPEG", quality=85)
+            self.images.append(buffer.getvalue())
+
+    def make(self, rng: random.Random) -> bytes:
+        return rng.choice(self.images) + os.urandom(16)
+
+
+# --- Measurements ---
+
+class Stats:
+    def __init__(self):
+        self.latencies = {name: [] for name in SCENARIOS}
+        self.errors = {name: 0 for name in SCENARIOS}
+        self.status_codes = {name: {} for name in SCENARIOS}
+
+    def record(self, name: str, seconds: float, status: int):
+        self.latencies[name].append(seconds)
+        codes = self.status_codes[name]
+        codes[str(status)] = codes.get(str(status), 0) + 1
+        if status >= 500 or status == 0:
+            self.errors[name] += 1
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors: int, duration: float, status_codes=None) -> dict:
+    values = sorted(latencies)
+    summary = {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / duration, 2) if duration else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+    if status_codes is not None:
+        summary["status_codes"] = status_codes
+    return summary
+
+
+def tree_rss_bytes(pid: int):
+    """RSS of a process and all its descendants (Linux /proc), None elsewhere"""
+    try:
+        children = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat") as f:
+                        ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+                    children.setdefault(ppid, []).append(int(entry))
+                except (OSError, ValueError, IndexError):
+                    continue
+
+        total, stack = 0, [pid]
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        while stack:
+            current = stack.pop()
+            try:
+                with open(f"/proc/{current}/statm") as f:
+                    total += int(f.read().split()[1]) * page_size
+            except OSError:
+                pass
+            stack.extend(children.get(current, []))
+        return total
+    except OSError:
+        return None
+
+
+async def sample_rss(pid: int, peak: dict, stop: asyncio.Event):
+    while not stop.is_set():
+        rss = tree_rss_bytes(pid)
+        if rss is not None:
+            peak["bytes"] = max(peak.get("bytes", 0), rss)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            pass
+
+
+# --- Scenarios ---
+
+class LoadRunner:
+    def __init__(self, client, args, photos: PhotoFactory):
+        self.client = client
+        self.args = args
+        self.photos = photos
+        self.rng = random.Random(args.seed)
+        self.order_ids = []
+        self.dates = []
+
+    def _order_form(self):
+        phone = "+48" + "".join(str(self.rng.randrange(10)) for _ in range(9))
+        return {
+            "phone": phone,
+            "address": f"ul. Polna {self.rng.randrange(1, 300)}, Kraków",
+            "description": self.rng.choice(DESCRIPTIONS),
+            "selected_date": self.rng.choice(self.dates) if self.dates else None,
+        }
+
+    async def seed(self):
+        start = date.today() + timedelta(days=1)
+        response = await self.client.post("/api/dates/bulk-ingest", json={
+            "ranges": [{"start": start.isoformat(), "end": (start + timedelta(days=90)).isoformat()}],
+        })
+        response.raise_for_status()
+        self.dates = [
+            (start + timedelta(days=offset)).isoformat()
+            for offset in range(91)
+            if (start + timedelta(days=offset)).weekday() < 5
+        ]
+
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def create():
+            async with semaphore:
+                response = await self.client.post("/api/orders", data=self._order_form())
+                if response.status_code == 200:
+                    self.order_ids.append(response.json()["id"])
+
+        await asyncio.gather(*(create() for _ in range(self.args.seed_orders)))
+
+    async def create(self):
+        count = self.rng.randint(0, self.args.max_photos)
+        files = [
+            ("files", (f"photo{i}.jpg", self.photos.make(self.rng), "image/jpeg"))
+            for i in range(count)
+        ]
+        response = await self.client.post("/api/orders", data=self._order_form(), files=files or None)
+        if response.status_code == 200:
+            self.order_ids.append(response.json()["id"])
+        return response
+
+    async def list(self):
+        params = {"limit": 50}
+        if self.rng.random() < 0.3:
+            params["status"] = self.rng.choice(STATUSES)
+        return await self.client.get("/api/orders", params=params)
+
+    async def dates_check(self):
+        return await self.client.get("/api/availability/check-dates")
+
+    async def patch(self):
+        if not self.order_ids:
+            return await self.list()
+        order_id = self.rng.choice(self.order_ids)
+        return await self.client.patch(
+            f"/api/orders/{order_id}/status", json={"status": self.rng.choice(STATUSES)}
+        )
+
+    async def run(self, duration: float, stats: Stats = None):
+        handlers = {"create": self.create, "list": self.list, "dates": self.dates_check, "patch": self.patch}
+        names = list(self.args.weights)
+        weights = [self.args.weights[name] for name in names]
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                name = self.rng.choices(names, weights)[0]
+                started = time.perf_counter()
+                try:
+                    response = await handlers[name]()
+                    status = response.status_code
+                except Exception as e:
+                    print(f"{name} failed: {e}")
+                    status = 0
+                if stats is not None:
+                    stats.record(name, time.perf_counter() - started, status)
+
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+
+
+# --- Targets ---
+
+async def run_in_process(args, photos: PhotoFactory) -> dict:
+    import httpx
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.chdir(BACKEND_DIR)
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            return await measure(client, args, photos, os.getpid())
+
+
+async def run_uvicorn(args, photos: PhotoFactory) -> dict:
+    import httpx
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            for _ in range(300):
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited during startup")
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not become healthy in 30 s")
+
+            return await measure(client, args, photos, server.pid)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+async def measure(client, args, photos: PhotoFactory, server_pid: int) -> dict:
+    runner = LoadRunner(client, args, photos)
+    print(f"Seeding {args.seed_orders} orders...")
+    await runner.seed()
+
+    peak = {}
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(server_pid, peak, stop))
+
+    if args.warmup > 0:
+        print(f"Warm-up {args.warmup:.0f} s...")
+        await runner.run(args.warmup)
+
+    print(f"Measuring {args.duration:.0f} s at concurrency {args.concurrency}...")
+    stats = Stats()
+    started = time.perf_counter()
+    await runner.run(args.duration, stats)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await sampler
+
+    scenarios = {
+        name: summarize(stats.latencies[name], stats.errors[name], elapsed, stats.status_codes[name])
+        for name in args.weights
+    }
+    all_latencies = [value for name in args.weights for value in stats.latencies[name]]
+    total = summarize(all_latencies, sum(stats.errors.values()), elapsed)
+
+    peak_rss = peak.get("bytes")
+    if peak_rss is None and not args.uvicorn:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "total": total,
+        "scenarios": scenarios,
+        "peak_rss_mb": round(peak_rss / 1024 / 1024, 1) if peak_rss else None,
+    }
+
+
+# --- Reporting ---
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result: dict, previous: dict = None):
+    def row(name, summary, before=None):
+        line = (f"{name:<8} {summary['requests']:>8} {summary['errors']:>6} {summary['rps']:>9.1f} "
+                f"{summary['p50_ms']:>9.1f} {summary['p95_ms']:>9.1f} {summary['p99_ms']:>9.1f}")
+        if before:
+            line += (f"   rps {_delta(summary['rps'], before['rps'])}"
+                     f"  p95 {_delta(summary['p95_ms'], before['p95_ms'])}"
+                     f"  p99 {_delta(summary['p99_ms'], before['p99_ms'])}")
+        print(line)
+
+    print(f"\n{'scenario':<8} {'requests':>8} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    previous_scenarios = (previous or {}).get("scenarios", {})
+    for name, summary in result["scenarios"].items():
+        row(name, summary, previous_scenarios.get(name))
+    row("total", result["total"], (previous or {}).get("total"))
+
+    rss = result["peak_rss_mb"]
+    line = f"\npeak RSS: {rss} MB" if rss is not None else "\npeak RSS: n/a"
+    if previous and previous.get("peak_rss_mb") and rss:
+        line += f" ({_delta(rss, previous['peak_rss_mb'])})"
+    print(line)
+
+
+def _delta(current: float, before: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(current - before) / before * 100:+.1f}%"
+
+
+async def main_async():
+    args = parse_args()
+    workdir = prepare_environment()
+    random.seed(args.seed)
+
+    photos = PhotoFactory(args.width, args.height)
+    if args.uvicorn:
+        result = await run_uvicorn(args, photos)
+    else:
+        result = await run_in_process(args, photos)
+
+    result["meta"] = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "mode": f"uvicorn x{args.workers}" if args.uvicorn else "in-process",
+        "database": os.environ["DATABASE_URL"].split("@")[-1],
+        "workdir": str(workdir),
+        "duration_s": args.duration,
+        "concurrency": args.concurrency,
+        "mix": args.weights,
+        "max_photos": args.max_photos,
+        "photo_size": args.photo_size,
+        "seed_orders": args.seed_orders,
+    }
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(result, previous)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
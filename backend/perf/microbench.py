@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks of hot helpers
+
+Times the upload, image, validation and notification helpers on fixed
+synthetic inputs (JPEG and WebP photos of several sizes, phone numbers,
+descriptions) and counts the memory they allocate:
+
+    upload     FileService.save_upload_file (new file / already stored)
+    image      optimize_image, create_thumbnail
+    validators app.utils.validators, app.core.validators
+    telegram   TelegramService.format_order_message
+
+Every benchmark is calibrated to run for about --time seconds; timings are
+per call (min / median / mean). Allocations come from one extra call under
+tracemalloc: peak traced memory and the net number of memory blocks the
+call left allocated. Pillow's pixel buffers live outside the Python
+allocator, so image peaks mostly show what decoders route through it.
+Results are saved as JSON so runs can be compared.
+
+Usage (from backend/):
+    python -m perf.microbench
+    python -m perf.microbench -k image --output perf/results/bench-base.json
+    python -m perf.microbench --compare perf/results/bench-base.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from perf.loadtest import BACKEND_DIR, RESULTS_DIR, git_revision, _delta
+
+IMAGE_SIZES = {"small": (640, 480), "medium": (1920, 1080), "large": (4000, 3000)}
+IMAGE_FORMATS = {"jpg": "JPEG", "webp": "WEBP"}
+
+PHONES = [
+    "+48123456789",
+    "+48 123 456 789",
+    "123456789",
+    "+48 12 345 67 89 ",
+    "+380-67-123-45-67",
+    "12-34",
+    "not a phone",
+    "+48 " + "1" * 40,
+]
+DESCRIPTIONS = [
+    "Cieknie kran",
+    "Nie działa gniazdko w kuchni, iskrzy przy podłączaniu czajnika. " * 4,
+    "Не працює розетка в коридорі, потрібна заміна. " * 20,
+    "x" * 1000,
+]
+FILENAMES = ["photo.jpg", "IMG_0001.JPEG", "scan.webp", "archive.tar.gz", "noextension", "../../etc/passwd"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-k", dest="pattern", help="run only benchmarks whose name contains this")
+    parser.add_argument("--time", type=float, default=0.5, help="target seconds per benchmark")
+    parser.add_argument("--min-rounds", type=int, default=5)
+    parser.add_argument("--output", help="result JSON path (default: perf/results/microbench-<time>.json)")
+    parser.add_argument("--compare", help="previous result JSON to compare against")
+    return parser.parse_args()
+
+
+# --- Inputs ---
+
+def render_image(size: tuple, fmt: str) -> bytes:
+    """Deterministic photo-like image: gradient plus blocks of noise"""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    width, height = size
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    step = max(width, height) // 16
+    for x in range(0, width, step):
+        for y in range(0, height, step):
+            shade = (x * 7 + y * 13) % 256
+            draw.rectangle([x, y, x + step // 2, y + step // 3], fill=(shade, 255 - shade, (shade * 3) % 256))
+    img = Image.blend(img, Image.effect_noise(size, 40).convert("RGB"), 0.25).filter(ImageFilter.SMOOTH)
+
+    buffer = io.BytesIO()
+    img.save(buffer, fmt, quality=90)
+    return buffer.getvalue()
+
+
+def upload_file(content: bytes, filename: str):
+    from fastapi import UploadFile
+    from starlette.datastructures import Headers
+
+    return UploadFile(
+        file=io.BytesIO(content),
+        filename=filename,
+        size=len(content),
+        headers=Headers({"content-type": "application/octet-stream"}),
+    )
+
+
+# --- Runner ---
+
+class Benchmark:
+    def __init__(self, name: str, func, setup=None, is_async: bool = False):
+        self.name = name
+        self.func = func
+        self.setup = setup or (lambda: ())
+        self.is_async = is_async
+
+    def call(self, loop, args):
+        if self.is_async:
+            return loop.run_until_complete(self.func(*args))
+        return self.func(*args)
+
+    def timed_call(self, loop, args) -> float:
+        if self.is_async:
+            async def timed():
+                started = time.perf_counter()
+                await self.func(*args)
+                return time.perf_counter() - started
+            return loop.run_until_complete(timed())
+
+        started = time.perf_counter()
+        self.func(*args)
+        return time.perf_counter() - started
+
+
+def run_benchmark(bench: Benchmark, loop, target: float, min_rounds: int) -> dict:
+    # Warm-up and calibration: group fast calls so timer resolution does not dominate
+    bench.timed_call(loop, bench.setup())
+    first = bench.timed_call(loop, bench.setup())
+    inner = 1 if first > 1e-3 else max(1, int(1e-3 / max(first, 1e-7)))
+    rounds = max(min_rounds, int(target / max(first * inner, 1e-7)))
+    rounds = min(rounds, 100_000)
+
+    per_call = []
+    for _ in range(rounds):
+        total = 0.0
+        for _ in range(inner):
+            total += bench.timed_call(loop, bench.setup())
+        per_call.append(total / inner)
+
+    # Allocations of one call (setup excluded)
+    args = bench.setup()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    bench.call(loop, args)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    net_blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "lineno"))
+
+    return {
+        "rounds": rounds * inner,
+        "min_us": round(min(per_call) * 1e6, 3),
+        "median_us": round(statistics.median(per_call) * 1e6, 3),
+        "mean_us": round(statistics.fmean(per_call) * 1e6, 3),
+        "stdev_us": round(statistics.stdev(per_call) * 1e6, 3) if len(per_call) > 1 else 0.0,
+        "ops_per_s": round(1 / statistics.median(per_call), 1) if statistics.median(per_call) else None,
+        "peak_kib": round(peak / 1024, 1),
+        "net_blocks": net_blocks,
+    }
+
+
+def build_benchmarks(workdir: Path) -> list:
+    from app.services.file_service import file_service
+    from app.services.telegram_service import telegram_service
+    from app.utils import validators as utils_validators
+    from app.core import validators as core_validators
+
+    benchmarks = []
+    images = {
+        (label, ext): render_image(size, fmt)
+        for label, size in IMAGE_SIZES.items()
+        for ext, fmt in IMAGE_FORMATS.items()
+    }
+
+    # Upload
+    upload_dir = workdir / "upload"
+    upload_dir.mkdir()
+    counter = iter(range(10**9))
+
+    for (label, ext), content in images.items():
+        def fresh(content=content, ext=ext):
+            # Unique trailing bytes: new content hash, so the file is written every call
+            return upload_file(content + next(counter).to_bytes(8, "big"), f"photo.{ext}"), str(upload_dir)
+
+        def stored(content=content, ext=ext):
+            return upload_file(content, f"photo.{ext}"), str(upload_dir)
+
+        benchmarks.append(Benchmark(f"upload.save_new[{ext}-{label}]", file_service.save_upload_file, fresh, True))
+        benchmarks.append(Benchmark(f"upload.save_dedup[{ext}-{label}]", file_service.save_upload_file, stored, True))
+
+    # Image processing (sync implementations, the executor only adds scheduling)
+    image_dir = workdir / "images"
+    image_dir.mkdir()
+    for (label, ext), content in images.items():
+        source = image_dir / f"{label}-source.{ext}"
+        source.write_bytes(content)
+        target = image_dir / f"{label}.{ext}"
+
+        def copy(source=source, target=target):
+            shutil.copyfile(source, target)
+            return (str(target),)
+
+        benchmarks.append(Benchmark(f"image.optimize_image[{ext}-{label}]", file_service.optimize_image, copy))
+        benchmarks.append(Benchmark(
+            f"image.create_thumbnail[{ext}-{label}]", file_service.create_thumbnail, lambda source=source: (str(source),)
+        ))
+
+    # Validators: one benchmark call covers the whole input set
+    def over(func, values, *extra):
+        return lambda: [func(value, *extra) for value in values]
+
+    future_dates = [(date.today() + timedelta(days=d)).isoformat() for d in (1, 30)] + ["2020-01-01", "31.12.2030"]
+    for module, prefix in ((utils_validators, "validators.utils"), (core_validators, "validators.core")):
+        benchmarks += [
+            Benchmark(f"{prefix}.validate_phone_number", over(module.validate_phone_number, PHONES)),
+            Benchmark(f"{prefix}.validate_date_format", over(module.validate_date_format, future_dates)),
+            Benchmark(f"{prefix}.validate_sms_code", over(module.validate_sms_code, ["1234", "12 34 56", "abcd", "1" * 12])),
+            Benchmark(f"{prefix}.sanitize_filename", over(module.sanitize_filename, FILENAMES)),
+        ]
+    benchmarks += [
+        Benchmark("validators.utils.validate_text_length",
+                  over(utils_validators.validate_text_length, DESCRIPTIONS, 10, 1000)),
+        Benchmark("validators.core.validate_text_length",
+                  over(core_validators.validate_text_length, DESCRIPTIONS, 10, 1000, "Opis")),
+        Benchmark("validators.utils.validate_file_extension",
+                  over(utils_validators.validate_file_extension, FILENAMES)),
+        Benchmark("validators.core.validate_file_extension",
+                  over(core_validators.validate_file_extension, FILENAMES, ["jpg", "jpeg", "png", "gif", "webp"])),
+    ]
+
+    # Notification text
+    for label, description in zip(("short", "medium", "long", "max"), DESCRIPTIONS):
+        benchmarks.append(Benchmark(
+            f"telegram.format_order_message[{label}]",
+            lambda description=description: telegram_service.format_order_message(
+                1234, "+48 123 456 789", "ul. Floriańska 15/3, 31-019 Kraków", description,
+                "2030-06-14T10:30:00", 3
+            ),
+        ))
+
+    return benchmarks
+
+
+def print_report(results: dict, previous: dict = None):
+    previous = previous or {}
+    print(f"\n{'benchmark':<52} {'median µs':>11} {'min µs':>11} {'ops/s':>11} {'peak KiB':>9} {'net blk':>7}")
+    for name, result in results.items():
+        line = (f"{name:<52} {result['median_us']:>11.1f} {result['min_us']:>11.1f} "
+                f"{result['ops_per_s'] or 0:>11.1f} {result['peak_kib']:>9.1f} {result['net_blocks']:>7}")
+        before = previous.get(name)
+        if before:
+            line += (f"   median {_delta(result['median_us'], before['median_us'])}"
+                     f"  peak {_delta(result['peak_kib'], before['peak_kib'])}")
+        print(line)
+
+
+def main():
+    args = parse_args()
+    workdir = Path(tempfile.mkdtemp(prefix="microbench-"))
+    os.environ.setdefault("UPLOAD_DIR", str(workdir / "uploads"))
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.chdir(BACKEND_DIR)
+
+    loop = asyncio.new_event_loop()
+    results = {}
+    try:
+        print("Rendering inputs...")
+        for bench in build_benchmarks(workdir):
+            if args.pattern and args.pattern not in bench.name:
+                continue
+            print(f"  {bench.name}", flush=True)
+            results[bench.name] = run_benchmark(bench, loop, args.time, args.min_rounds)
+    finally:
+        loop.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["benchmarks"]
+    print_report(results, previous)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"microbench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "git_revision": git_revision(),
+                "python": sys.version.split()[0],
+                "target_time_s": args.time,
+            },
+            "benchmarks": results,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()